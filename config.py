@@ -3,6 +3,8 @@ import os
 import sys
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -20,6 +22,36 @@ class OpenAIConfig:
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.model_default = os.getenv("OPENAI_MODEL_DEFAULT", "gpt-4o-mini")
         self.model_5 = os.getenv("OPENAI_MODEL_5", "gpt-4o-mini")
+        # Optional prompt token budget; requests over it fail before reaching OpenAI
+        self.max_prompt_tokens = int(os.getenv("OPENAI_MAX_PROMPT_TOKENS", "0")) or None
+        # In-process cache of successful generations; set either value to 0 to disable
+        self.cache_ttl_seconds = int(os.getenv("OPENAI_CACHE_TTL_SECONDS", "86400"))
+        self.cache_max_entries = int(os.getenv("OPENAI_CACHE_MAX_ENTRIES", "2048"))
+        # Requests beyond this many in flight per worker get a 503; 0 disables the limit
+        self.concurrent_requests_per_worker = int(os.getenv("CONCURRENT_REQUESTS_PER_WORKER", "16"))
+        # OpenAI calls a single fanned-out request (e.g. many sessions) may run at once
+        self.max_concurrency = int(os.getenv("OPENAI_MAX_CONCURRENCY", "20"))
+        # Client-side rate limits, matching the account's OpenAI limits; 0 disables each
+        self.requests_per_minute = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "0"))
+        self.tokens_per_minute = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "0"))
+        # max_output_tokens caps derived from each output schema: about 350 tokens per
+        # lesson plan session, 2000 per session's detailed content and 250 per 5 marks
+        # of a question paper. Raise them if responses come back truncated
+        self.lesson_plan_tokens_per_session = int(os.getenv("OPENAI_LESSON_PLAN_TOKENS_PER_SESSION", "350"))
+        self.session_content_max_output_tokens = int(os.getenv("OPENAI_SESSION_CONTENT_MAX_OUTPUT_TOKENS", "2000"))
+        self.questions_tokens_per_5_marks = int(os.getenv("OPENAI_QUESTIONS_TOKENS_PER_5_MARKS", "250"))
+        # Seconds to wait for each OpenAI call before giving up; fused batch calls get
+        # the per-item timeout once per item, and streams time out only the initial request
+        self.lesson_plan_timeout_seconds = float(os.getenv("OPENAI_LESSON_PLAN_TIMEOUT_SECONDS", "60"))
+        self.session_content_timeout_seconds = float(os.getenv("OPENAI_SESSION_CONTENT_TIMEOUT_SECONDS", "90"))
+        self.questions_timeout_seconds = float(os.getenv("OPENAI_QUESTIONS_TIMEOUT_SECONDS", "60"))
+        self.student_answer_timeout_seconds = float(os.getenv("OPENAI_STUDENT_ANSWER_TIMEOUT_SECONDS", "45"))
+        self.request_timeout_seconds = float(os.getenv("OPENAI_REQUEST_TIMEOUT_SECONDS", "120"))
+        # Student conversations keep at least this many recent messages verbatim; older
+        # messages are replaced by a cached summary. 0 sends the full history
+        self.student_history_recent_messages = int(os.getenv("STUDENT_HISTORY_RECENT_MESSAGES", "6"))
+        # Send OpenAI calls through aiohttp instead of httpx (needs the optional aiohttp package)
+        self.use_aiohttp_transport = os.getenv("OPENAI_USE_AIOHTTP_TRANSPORT", "false").lower() in ("1", "true", "yes")
         
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable is not set")
@@ -39,14 +71,27 @@ class OpenAIConfig:
 openai_config = OpenAIConfig()
 
 
-def create_app() -> FastAPI:
+class StreamAwareGZipMiddleware(GZipMiddleware):
+    """GZip responses, except streaming endpoints whose chunks must not be held back by the compressor"""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+def create_app(lifespan=None) -> FastAPI:
     """Create and configure the FastAPI application"""
     app = FastAPI(
+        lifespan=lifespan,
         title="School AI API",
         description="AI-powered educational content generation API using OpenAI",
         version="1.0.0",
         docs_url="/docs",
-        redoc_url="/redoc"
+        redoc_url="/redoc",
+        # Serialize the large nested content payloads with orjson
+        default_response_class=ORJSONResponse
     )
     
     # Add CORS middleware
@@ -56,8 +101,13 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Lets browser clients read the conversation ID of streamed answers
+        expose_headers=["X-Conversation-Id"],
     )
     
+    # Generated lesson content is large, repetitive JSON that compresses well
+    app.add_middleware(StreamAwareGZipMiddleware, minimum_size=1024, compresslevel=5)
+    
     return app
 
 
@@ -0,0 +1,22 @@
+"""
+Shared service instances for all routers
+"""
+
+from fastapi import Request
+
+from helpers.youtube import YouTubeHelper
+from services.openai_service import OpenAIService
+
+
+def get_openai_service(request: Request) -> OpenAIService:
+    """Return the OpenAIService created at application startup
+
+    Used as a FastAPI dependency so every endpoint shares one client and
+    connection pool.
+    """
+    return request.app.state.openai_service
+
+
+def get_youtube_helper(request: Request) -> YouTubeHelper:
+    """Return the YouTubeHelper created at application startup"""
+    return request.app.state.youtube_helper
@@ -1,14 +1,17 @@
+import asyncio
 import os
+import httpx
 import requests
-from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 
-# Load environment variables
-load_dotenv()
+from services.prompt_cache import PromptCache
 
 logger = logging.getLogger(__name__)
 
+# Shared default for missing list fields in API responses; avoids a new list per lookup
+_EMPTY = ()
+
 class YouTubeHelper:
     """Helper class for YouTube Data API interactions"""
     
@@ -28,6 +31,17 @@ class YouTubeHelper:
         
         if not self.api_key:
             logger.warning("YouTube API key not found. Set YOUTUBE_API_KEY environment variable.")
+        
+        # Created on first async search so it binds to the running event loop
+        self._async_client: Optional[httpx.AsyncClient] = None
+        
+        # Keyword search results shared across requests; concurrent searches for the
+        # same keyword wait on a single in-flight lookup
+        self._search_cache = PromptCache(
+            maxsize=int(os.getenv('YOUTUBE_CACHE_MAX_ENTRIES', '10000')),
+            ttl=int(os.getenv('YOUTUBE_CACHE_TTL_SECONDS', '21600'))
+        )
+        self._inflight_searches: Dict[Tuple, asyncio.Future] = {}
     
     def search_videos_by_keywords(self, keywords: List[str], 
                                 max_results: int = 3,
@@ -80,10 +94,55 @@ class YouTubeHelper:
         results["data"] = all_videos
         return results
     
+    @staticmethod
+    def merge_search_results(primary: Dict[str, Any], *others: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merge search_videos_by_keywords results, keeping the primary videos first
+        and dropping duplicate video IDs. Unsuccessful extra results are ignored.
+        """
+        if not primary.get("success"):
+            return primary
+        
+        seen_video_ids = set()
+        videos = []
+        keywords = list(primary.get("keywords_searched") or _EMPTY)
+        for result in (primary, *others):
+            if not result.get("success"):
+                continue
+            if result is not primary:
+                keywords.extend(result.get("keywords_searched") or _EMPTY)
+            for video in result.get("data") or _EMPTY:
+                if video["video_id"] not in seen_video_ids:
+                    seen_video_ids.add(video["video_id"])
+                    videos.append(video)
+        
+        return {
+            "success": True,
+            "data": videos,
+            "total_videos": len(videos),
+            "keywords_searched": list(dict.fromkeys(keywords))
+        }
+    
     def _search_single_keyword(self, keyword: str, max_results: int, 
                              video_duration: str, video_category: str) -> List[Dict[str, Any]]:
         """Search for videos with a single keyword"""
+        params = self._search_params(keyword, max_results, video_duration, video_category)
+        response = requests.get(f"{self.base_url}/search", params=params)
+        response.raise_for_status()
+        
+        data = response.json()
+        videos = []
+        
+        for item in data.get('items') or _EMPTY:
+            video_info = self._extract_video_info(item)
+            if video_info:
+                videos.append(video_info)
         
+        return videos
+    
+    def _search_params(self, keyword: str, max_results: int,
+                       video_duration: str, video_category: str) -> Dict[str, Any]:
+        """Build the search.list query parameters for a keyword"""
         # Build search query with educational focus
         search_query = f"{keyword} educational tutorial explanation"
         
@@ -108,18 +167,7 @@ class YouTubeHelper:
         if video_category:
             params['videoCategoryId'] = self._get_category_id(video_category)
         
-        response = requests.get(f"{self.base_url}/search", params=params)
-        response.raise_for_status()
-        
-        data = response.json()
-        videos = []
-        
-        for item in data.get('items', []):
-            video_info = self._extract_video_info(item)
-            if video_info:
-                videos.append(video_info)
-        
-        return videos
+        return params
     
     def _extract_video_info(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Extract relevant information from YouTube API response item"""
@@ -133,24 +181,29 @@ class YouTubeHelper:
             # Get additional video details
             video_details = self._get_video_details(video_id)
             
-            return {
-                'video_id': video_id,
-                'title': snippet.get('title', ''),
-                'description': snippet.get('description', '')[:200] + '...' if len(snippet.get('description', '')) > 200 else snippet.get('description', ''),
-                'channel_title': snippet.get('channelTitle', ''),
-                'channel_id': snippet.get('channelId', ''),
-                'published_at': snippet.get('publishedAt', ''),
-                'thumbnail_url': snippet.get('thumbnails', {}).get('medium', {}).get('url', ''),
-                'video_url': f"https://www.youtube.com/watch?v={video_id}",
-                'embed_url': f"https://www.youtube.com/embed/{video_id}",
-                'duration': video_details.get('duration', 'Unknown'),
-                'view_count': video_details.get('view_count', 'Unknown'),
-                'like_count': video_details.get('like_count', 'Unknown')
-            }
+            return self._format_video_info(video_id, snippet, video_details)
         except Exception as e:
             logger.error(f"Error extracting video info: {str(e)}")
             return None
     
+    @staticmethod
+    def _format_video_info(video_id: str, snippet: Dict[str, Any], video_details: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine a search result snippet and its video details into the API's video shape"""
+        return {
+            'video_id': video_id,
+            'title': snippet.get('title', ''),
+            'description': snippet.get('description', '')[:200] + '...' if len(snippet.get('description', '')) > 200 else snippet.get('description', ''),
+            'channel_title': snippet.get('channelTitle', ''),
+            'channel_id': snippet.get('channelId', ''),
+            'published_at': snippet.get('publishedAt', ''),
+            'thumbnail_url': snippet.get('thumbnails', {}).get('medium', {}).get('url', ''),
+            'video_url': f"https://www.youtube.com/watch?v={video_id}",
+            'embed_url': f"https://www.youtube.com/embed/{video_id}",
+            'duration': video_details.get('duration', 'Unknown'),
+            'view_count': video_details.get('view_count', 'Unknown'),
+            'like_count': video_details.get('like_count', 'Unknown')
+        }
+    
     def _get_video_details(self, video_id: str) -> Dict[str, Any]:
         """Get additional video details like duration, views, likes"""
         try:
@@ -163,26 +216,150 @@ class YouTubeHelper:
             response = requests.get(f"{self.base_url}/videos", params=params)
             response.raise_for_status()
             
-            data = response.json()
-            items = data.get('items', [])
-            
-            if not items:
-                return {}
-            
-            item = items[0]
-            content_details = item.get('contentDetails', {})
-            statistics = item.get('statistics', {})
-            
-            # Parse ISO 8601 duration (PT4M13S) to readable format
-            duration = content_details.get('duration', '')
-            readable_duration = self._parse_duration(duration)
+            return self._parse_video_details(response.json())
             
+        except Exception as e:
+            logger.error(f"Error getting video details for {video_id}: {str(e)}")
+            return {}
+    
+    def _parse_video_details(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract duration and statistics from a videos.list response"""
+        items = data.get('items') or _EMPTY
+        
+        if not items:
+            return {}
+        
+        item = items[0]
+        content_details = item.get('contentDetails', {})
+        statistics = item.get('statistics', {})
+        
+        # Parse ISO 8601 duration (PT4M13S) to readable format
+        duration = content_details.get('duration', '')
+        readable_duration = self._parse_duration(duration)
+        
+        return {
+            'duration': readable_duration,
+            'view_count': statistics.get('viewCount', '0'),
+            'like_count': statistics.get('likeCount', '0'),
+            'comment_count': statistics.get('commentCount', '0')
+        }
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Return the shared async HTTP client, creating it on first use"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=10.0)
+        return self._async_client
+    
+    async def aclose(self):
+        """Close the async HTTP client"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+    
+    async def search_videos_by_keywords_async(self, keywords: List[str],
+                                              max_results: int = 3,
+                                              video_duration: str = "medium",
+                                              video_category: str = "Education") -> Dict[str, Any]:
+        """
+        Async variant of search_videos_by_keywords
+        
+        All keywords are searched concurrently, and the video details for each
+        keyword's results are fetched concurrently, so the wall time is roughly one
+        search plus one details round trip instead of their sum over all videos.
+        Returns the same structure as search_videos_by_keywords.
+        """
+        if not self.api_key:
             return {
-                'duration': readable_duration,
-                'view_count': statistics.get('viewCount', '0'),
-                'like_count': statistics.get('likeCount', '0'),
-                'comment_count': statistics.get('commentCount', '0')
+                "success": False,
+                "error": "YouTube API key not configured",
+                "data": {}
             }
+        
+        outcomes = await asyncio.gather(
+            *(
+                self._search_single_keyword_async(keyword, max_results, video_duration, video_category)
+                for keyword in keywords
+            ),
+            return_exceptions=True
+        )
+        
+        results = {
+            "success": True,
+            "data": [],
+            "total_videos": 0,
+            "keywords_searched": keywords
+        }
+        all_videos = []
+        
+        for keyword, outcome in zip(keywords, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error searching for keyword '{keyword}': {str(outcome)}")
+                continue
+            all_videos.extend(outcome)
+            results["total_videos"] += len(outcome)
+            logger.info(f"Found {len(outcome)} videos for keyword: {keyword}")
+        
+        results["data"] = all_videos
+        return results
+    
+    async def _search_single_keyword_async(self, keyword: str, max_results: int,
+                                           video_duration: str, video_category: str) -> List[Dict[str, Any]]:
+        """Search for videos with a single keyword, reusing cached or in-flight results"""
+        key = (keyword, max_results, video_duration, video_category)
+        if self._search_cache.enabled:
+            hit, videos = self._search_cache.get(key)
+            if hit:
+                return videos
+        
+        future = self._inflight_searches.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._fetch_single_keyword_async(keyword, max_results, video_duration, video_category)
+            )
+            self._inflight_searches[key] = future
+            future.add_done_callback(lambda done: self._finish_search(key, done))
+        # One caller being cancelled must not cancel the lookup other callers share
+        return await asyncio.shield(future)
+    
+    def _finish_search(self, key: Tuple, future: asyncio.Future):
+        """Drop a finished lookup from the in-flight table and cache its videos if it succeeded"""
+        self._inflight_searches.pop(key, None)
+        if not future.cancelled() and future.exception() is None and self._search_cache.enabled:
+            self._search_cache.set(key, future.result())
+    
+    async def _fetch_single_keyword_async(self, keyword: str, max_results: int,
+                                          video_duration: str, video_category: str) -> List[Dict[str, Any]]:
+        """Search for videos with a single keyword and fetch their details concurrently"""
+        client = self._get_async_client()
+        params = self._search_params(keyword, max_results, video_duration, video_category)
+        response = await client.get(f"{self.base_url}/search", params=params)
+        response.raise_for_status()
+        
+        found = []
+        for item in response.json().get('items') or _EMPTY:
+            video_id = item.get('id', {}).get('videoId')
+            if video_id:
+                found.append((video_id, item.get('snippet', {})))
+        
+        details = await asyncio.gather(*(self._get_video_details_async(video_id) for video_id, _ in found))
+        return [
+            self._format_video_info(video_id, snippet, video_details)
+            for (video_id, snippet), video_details in zip(found, details)
+        ]
+    
+    async def _get_video_details_async(self, video_id: str) -> Dict[str, Any]:
+        """Async variant of _get_video_details"""
+        try:
+            params = {
+                'part': 'contentDetails,statistics',
+                'id': video_id,
+                'key': self.api_key
+            }
+            
+            response = await self._get_async_client().get(f"{self.base_url}/videos", params=params)
+            response.raise_for_status()
+            
+            return self._parse_video_details(response.json())
             
         except Exception as e:
             logger.error(f"Error getting video details for {video_id}: {str(e)}")
@@ -1,11 +1,26 @@
-from fastapi import HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
 
 from config import create_app, get_logger
 from exceptions import http_exception_handler, general_exception_handler
+from helpers.youtube import YouTubeHelper
 from routers import health, lesson_planning, questions, student, knowledge_points
+from services.openai_service import OpenAIService
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared services on startup and close their connection pools on shutdown"""
+    app.state.openai_service = OpenAIService()
+    app.state.youtube_helper = YouTubeHelper()
+    yield
+    await app.state.youtube_helper.aclose()
+    await app.state.openai_service.aclose()
+
 
 # Initialize FastAPI app
-app = create_app()
+app = create_app(lifespan=lifespan)
 logger = get_logger()
 
 # Include routers
@@ -17,6 +17,45 @@ class SessionData(BaseModel):
     objectives: List[str]
 
 
+class LessonPlanSession(BaseModel):
+    sessionNumber: int
+    title: str
+    summary: str
+    duration: str
+    objectives: List[str]
+    
+    class Config:
+        extra = "forbid"
+
+
+class LessonPlanOutput(BaseModel):
+    """Lesson plan output schema, enforced by OpenAI's strict JSON schema mode"""
+    sessions: List[LessonPlanSession]
+    
+    class Config:
+        extra = "forbid"
+
+
+class LessonPlanBatchResult(BaseModel):
+    requestId: int
+    sessions: List[LessonPlanSession]
+    
+    class Config:
+        extra = "forbid"
+
+
+class LessonPlanBatchOutput(BaseModel):
+    """Output schema for several lesson plans generated in one call"""
+    results: List[LessonPlanBatchResult]
+    
+    class Config:
+        extra = "forbid"
+
+
+class LessonPlansBatchRequest(BaseModel):
+    plans: List[LessonPlanRequest] = Field(..., min_length=1, max_length=20, description="Lesson plans to generate; up to 5 share one call")
+
+
 class KPDescription(BaseModel):
     title: str = Field(..., description="Knowledge point title")
     description: str = Field(..., description="Knowledge point description")
@@ -32,6 +71,10 @@ class DetailedSessionRequest(BaseModel):
     kp_list: List[KPDescription] = Field(..., description="List of knowledge points with descriptions")
 
 
+class DetailedSessionsBatchRequest(BaseModel):
+    sessions: List[DetailedSessionRequest] = Field(..., min_length=1, max_length=20, description="Sessions to generate content for; up to 4 share one call")
+
+
 class QuestionGenerationRequest(BaseModel):
     class_name: str = Field(..., description="Class/Grade (e.g., 5th, 10th)")
     subject_name: str = Field(..., description="Subject name")
@@ -39,6 +82,10 @@ class QuestionGenerationRequest(BaseModel):
     total_marks: int = Field(..., description="Total marks for the questions")
 
 
+class QuestionPapersBatchRequest(BaseModel):
+    papers: List[QuestionGenerationRequest] = Field(..., min_length=1, max_length=8, description="Question papers to generate in one call")
+
+
 class APIResponse(BaseModel):
     success: bool
     data: Optional[Dict[str, Any]] = None
@@ -65,12 +112,19 @@ class StudentQuestionRequest(BaseModel):
         default=[], 
         description="Previous conversation history for context"
     )
+    conversation_id: Optional[str] = Field(
+        None,
+        description="Conversation identifier from a previous answer; a new one is issued when omitted"
+    )
 
 
 class StudentAnswerResponse(BaseModel):
     answer: str = Field(..., description="AI's detailed answer")
     conversation_id: Optional[str] = Field(None, description="Conversation identifier for tracking")
-    updated_history: List[ConversationMessage] = Field(..., description="Updated conversation history")
+    new_messages: List[ConversationMessage] = Field(
+        ...,
+        description="This turn's question and answer, to append to the client's conversation history"
+    )
 
 
 # Knowledge Points Models
@@ -82,6 +136,18 @@ class KnowledgePointRequest(BaseModel):
     section: Optional[str] = Field(None, description="Specific section within chapter (optional)")
 
 
+class KnowledgePointsBulkRequest(BaseModel):
+    board: str = Field(default="CBSE", description="Curriculum board (e.g., CBSE, ICSE, State)")
+    grade: int = Field(..., description="Grade/Class (e.g., 5, 10)")
+    subject: str = Field(..., description="Subject name (e.g., Mathematics, Science)")
+    chapter: str = Field(..., description="Chapter title")
+    sections: List[str] = Field(..., min_length=1, max_length=20, description="Sections of the chapter, each generated with its own concurrent call")
+
+
+class KnowledgePointsBatchRequest(BaseModel):
+    jobs: List[KnowledgePointRequest] = Field(..., min_length=1, description="Chapters/sections to generate knowledge points for in one Batch API job")
+
+
 class AssessmentExample(BaseModel):
     example: str = Field(..., description="Observable assessment example")
 
@@ -170,4 +236,8 @@ class SessionSummaryRequest(BaseModel):
     knowledge_points: List[KnowledgePointItem] = Field(..., description="List of knowledge points in this session")
     
     class Config:
-        populate_by_name = True
\ No newline at end of file
+        populate_by_name = True
+
+
+class SessionSummariesBatchRequest(BaseModel):
+    sessions: List[SessionSummaryRequest] = Field(..., min_length=1, description="Sessions to summarize in one Batch API job")
@@ -2,15 +2,350 @@
 Prompt templates for OpenAI API interactions
 """
 
-from typing import List, Dict, Any
+import sys
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+from typing import List, Dict, Any, Iterable, Iterator, Tuple, TypedDict
 
+import orjson
+
+from models import LessonPlanBatchOutput, LessonPlanOutput, LessonPlanSession
+
+
+# Display name used in prompts for each curriculum board; unknown boards are used as-is
+_BOARD_CONTEXT = {"CBSE": "CBSE/NCERT"}
+
+
+# JSON skeletons embedded in the prompts; kept as resource files and read once
+# at import so they are not re-formatted on each call
+_SCHEMA_DIR = Path(__file__).parent / "schemas"
+
+
+def _load_schema(name: str, validate: bool = True) -> str:
+    """Read a JSON skeleton from the schemas directory
+    
+    The text is kept verbatim (its compact layout is part of the prompt) but is
+    parsed once here so a malformed schema file fails at startup, not per request.
+    """
+    schema = (_SCHEMA_DIR / name).read_text(encoding="utf-8").rstrip("\n")
+    if validate:
+        try:
+            orjson.loads(schema)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in prompt schema {name}: {e}") from e
+    return schema
+
+
+_SESSION_CONTENT_SCHEMA = _load_schema("session_content.json.tmpl")
+_QUESTIONS_SCHEMA = _load_schema("questions_paper.json.tmpl")
+# Contains <placeholder> values, so it is not strict JSON
+_KNOWLEDGE_POINTS_SCHEMA = _load_schema("knowledge_points.json.tmpl", validate=False)
+
+
+# Output format footers shared by the KP grouping and session summary prompts
+_JSON_FORMAT_LEAD = "Return ONLY JSON in this exact format:\n"
+
+_KP_GROUPING_OUTPUT_FORMAT = _JSON_FORMAT_LEAD + """{
+  "sessions": [
+    {
+      "session_number": 1,
+      "session_title": "...",
+      "kp_ids": ["1", "2", "3"]
+    }
+  ]
+}"""
+
+_SESSION_SUMMARY_OUTPUT_FORMAT = _JSON_FORMAT_LEAD + """{
+  "summary": "",
+  "objectives": []
+}"""
+
+
+# Static instructions are built once as plain-string prefixes; only the short
+# request-specific suffix after them is substituted per call
+_KNOWLEDGE_POINTS_PREFIX = """Decompose the curriculum into atomic, teachable Knowledge Points (KPs).
+
+RETURN ONLY this JSON structure (no syllabus wrapper):
+
+""" + _KNOWLEDGE_POINTS_SCHEMA + """
+
+GUIDELINES:
+1. Each KP = ONE clear cognitive skill (atomic)
+2. Ordered by prerequisite dependency
+3. Bloom level must match action verbs
+4. IRT difficulty increases with abstraction
+5. Assessment examples = exactly 2
+6. Assessment criteria weightages sum to 100%
+7. Use NCERT terminology for the subject and grade in the curriculum input
+8. Prerequisite KPs reference placeholder IDs (server will generate final IDs)
+
+"""
+
+_KNOWLEDGE_POINTS_REQUEST = Template("""CURRICULUM INPUT:
+- Grade: ${grade}
+- Subject: ${subject}
+- Chapter: ${chapter}
+- Scope: ${section_spec}
+""")
+
+# The KP grouping and session summary prompts put their fixed instructions and
+# output format first and the chapter/session details last, so calls for the
+# same chapter share the longest possible prefix for OpenAI prompt caching
+_KP_GROUPING_PREFIX = """Group the knowledge points below into teaching sessions. The grouping must be coherent and respect:
+1. Prerequisite dependencies (prerequisites must come in earlier sessions)
+2. Cognitive progression (easier → harder)
+3. Conceptual coherence within each session
+4. Balanced distribution across sessions
+5. The board's curriculum standards and terminology
+
+""" + _KP_GROUPING_OUTPUT_FORMAT + """
+
+"""
+
+_KP_GROUPING_REQUEST = Template("""Board: ${board_context}
+Chapter: ${chapter}
+Class: ${class_name}
+Subject: ${subject}
+Session Duration: ${session_duration}
+
+Knowledge Points:
+${kps_formatted}
+
+Provide exactly ${number_of_sessions} sessions, following the rules and format above.""")
+
+_SESSION_SUMMARY_PREFIX = """Task:
+Create a concise instructional overview for the session described below, consisting of:
+1. A short session summary (2-4 sentences)
+2. A list of instructional objectives (2-4 objectives)
+
+""" + _SESSION_SUMMARY_OUTPUT_FORMAT + """
+
+"""
+
+_SESSION_SUMMARY_REQUEST = Template("""Context:
+- Board: ${board_context}
+- Chapter: ${chapter}
+- Class: ${class_name}
+- Subject: ${subject}
+- Session Title: ${session_title}
+
+Knowledge Points included in this session:
+${kps_formatted}""")
+
+
+# Static instructions and schemas come first so every request shares the same
+# prompt prefix (OpenAI caches identical prefixes automatically); only the
+# short request-specific suffix is substituted per call
+_LESSON_PLAN_PREFIX = """Each session includes: 
+- title (clear),
+- summary (1-2 sentences),
+- duration (the session duration given below),
+- 3-4 objectives.
+
+Format:
+{"sessions": [{"sessionNumber": 1, "title": "", "summary": "", "duration": "", "objectives": []}]}
+
+"""
+
+_LESSON_PLAN_BATCH_PREFIX = """Create one lesson plan for each request below.
+Each lesson plan is a list of sequential sessions. Each session includes: 
+- title (clear),
+- summary (1-2 sentences),
+- duration (the session duration given for its request),
+- 3-4 objectives.
+
+Format, with exactly one entry per request:
+{"results": [{"requestId": 1, "sessions": [{"sessionNumber": 1, "title": "", "summary": "", "duration": "", "objectives": []}]}]}
+
+"""
+
+_LESSON_PLAN_REQUEST = Template("""Generate ${number_of_sessions} sequential sessions for ${subject_name} Class ${class_name}, Chapter: "${chapter_title}"
+Session duration: ${default_session_duration}""")
+
+# Single-session variant, used when a lesson plan is generated one session per call
+_LESSON_PLAN_SESSION_PREFIX = """The session includes: 
+- title (clear),
+- summary (1-2 sentences),
+- duration (the session duration given below),
+- 3-4 objectives.
+
+Format:
+{"sessionNumber": 1, "title": "", "summary": "", "duration": "", "objectives": []}
+
+"""
+
+_LESSON_PLAN_SESSION_REQUEST = Template("""Chapter "${chapter_title}" of ${subject_name} Class ${class_name} is taught in ${number_of_sessions} sequential sessions.
+Generate session ${session_number} of ${number_of_sessions}, covering only the part of the chapter that belongs at this point in the sequence.
+Session duration: ${default_session_duration}""")
+
+_SESSION_CONTENT_PREFIX = """Output JSON keys (fill with relevant content, no placeholders):
+""" + _SESSION_CONTENT_SCHEMA + """
+
+"""
+
+# Request labels for the session content prompt; each is followed by its value
+_SESSION_CONTENT_LABELS = (
+    "Generate a detailed lesson plan for:\nSession Title: ",
+    "\nSubject: ",
+    "\nClass: ",
+    " standard\nDuration: ",
+    "\nInstructional Summary:\n",
+    "\nLearning Objectives:\n",
+    "\nKnowledge Points to be covered in this session:\n",
+)
+
+_SESSION_CONTENT_BATCH_PREFIX = """Generate detailed content for each session below, in the order given.
+Output ONLY JSON as {"sessions": [<session object>, ...]} with exactly one object per session.
+Each session object has these keys (fill with relevant content, no placeholders):
+""" + _SESSION_CONTENT_SCHEMA + """
+
+"""
+
+
+def _session_content_parts(title: str, subject_name: str, class_name: str, duration: str, summary: str,
+                           objectives: str, kp_list_with_description: str) -> tuple:
+    """Interleave the session content request labels with their values, ready for str.join"""
+    labels = _SESSION_CONTENT_LABELS
+    return (
+        labels[0], title,
+        labels[1], subject_name,
+        labels[2], class_name,
+        labels[3], duration,
+        labels[4], summary,
+        labels[5], objectives,
+        labels[6], kp_list_with_description
+    )
+
+
+_QUESTIONS_RULES = """Rules:
+- Maintain difficulty split: Easy 40%, Medium 40%, Hard 20%.
+- All questions must be NCERT-based and conceptually correct.
+- Do NOT change counts/marks.
+
+"""
+
+_QUESTIONS_PREFIX = """Output ONLY JSON in this structure:
+
+""" + _QUESTIONS_SCHEMA + """
+
+""" + _QUESTIONS_RULES
+
+_QUESTIONS_BATCH_PREFIX = """Create one question paper for each request below.
+Output ONLY JSON in this structure, with exactly one entry per request:
+
+{"results": [{"requestId": 1, "paper": <question paper>}]}
+
+Each <question paper> must follow this structure:
+
+""" + _QUESTIONS_SCHEMA + """
+
+""" + _QUESTIONS_RULES
+
+_QUESTIONS_REQUEST = Template("""Create a Class ${class_name} ${subject_name} question paper from these chapters:
+${chapters_text}
+
+Total marks: ${total_marks}
+
+Use EXACTLY this many questions (computed by backend):
+
+A: ${count_a} MCQ (1 mark each)
+B: ${count_b} VSA (2 marks each)
+C: ${count_c} SA (3 marks each)
+D: ${count_d} LA (5 marks each)
+E: ${count_e} CASE (4 marks each, each CASE must contain 3 sub-questions: 1m, 1m, 2m)""")
+
+
+@lru_cache(maxsize=256)
+def _join_chapters(chapters: tuple) -> str:
+    """Join chapter names once per distinct chapter set"""
+    return ", ".join(chapters)
+
+
+def _questions_request_block(class_name: str, subject_name: str, chapters, total_marks: int,
+                             allocation: Dict[str, Any]) -> str:
+    """Render the request-specific part of a questions prompt"""
+    return _QUESTIONS_REQUEST.substitute(
+        class_name=class_name,
+        subject_name=subject_name,
+        chapters_text=_join_chapters(tuple(chapters)),
+        total_marks=total_marks,
+        count_a=allocation["A"],
+        count_b=allocation["B"],
+        count_c=allocation["C"],
+        count_d=allocation["D"],
+        count_e=allocation["E"]
+    )
+
+
+@lru_cache(maxsize=512)
+def _render_questions_prompt(class_name: str, subject_name: str, chapters: tuple,
+                             total_marks: int, allocation: tuple) -> str:
+    """Render the questions prompt from hashable arguments so results can be memoized"""
+    return _QUESTIONS_PREFIX + _questions_request_block(
+        class_name, subject_name, chapters, total_marks, dict(allocation)
+    )
+
+
+class PromptTooLongError(Exception):
+    """Raised when a prompt exceeds the configured token budget"""
+
+
+# Encoders are expensive to build, so keep one per model
+_ENCODERS: Dict[str, Any] = {}
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Count prompt tokens with tiktoken, or estimate ~4 characters per token if it is not installed"""
+    encoder = _ENCODERS.get(model)
+    if encoder is None:
+        try:
+            import tiktoken
+        except ImportError:
+            return len(text) // 4 + 1
+        try:
+            encoder = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoder = tiktoken.get_encoding("o200k_base")
+        _ENCODERS[model] = encoder
+    return len(encoder.encode(text))
+
+
+def check_prompt_budget(messages: List[Dict[str, str]], model: str, max_tokens: int = None) -> None:
+    """Raise PromptTooLongError if the messages would exceed max_tokens; no-op without a budget"""
+    if not max_tokens:
+        return
+    tokens = sum(count_tokens(message["content"], model) for message in messages)
+    if tokens > max_tokens:
+        raise PromptTooLongError(f"Prompt is {tokens} tokens, over the budget of {max_tokens}")
+
+
+class _BatchReqFields(TypedDict):
+    custom_id: str
+    system: str
+    user: str
+    model: str
+
+
+class BatchReq(_BatchReqFields, total=False):
+    """One request line for the OpenAI Batch API"""
+    # Sent as the request's Responses API metadata, which its response echoes back
+    metadata: Dict[str, str]
 
 
 class PromptTemplates:
     """Class containing all prompt templates for the School AI API"""
     
-    # System messages for different functionalities
-    LESSON_PLAN_SYSTEM = """You are an expert CBSE/NCERT lesson planner and classroom pedagogy designer.
+    # Larger batches noticeably degrade per-paper accuracy
+    MAX_QUESTIONS_BATCH_SIZE = 8
+    # Each session's content is long, so keep fused batches within output limits
+    MAX_SESSION_CONTENT_BATCH_SIZE = 4
+    # Lesson plans are short, but every plan in a batch shares one output limit
+    MAX_LESSON_PLAN_BATCH_SIZE = 5
+    
+    # System messages for different functionalities; interned so every request
+    # shares one string object
+    LESSON_PLAN_SYSTEM = sys.intern("""You are an expert CBSE/NCERT lesson planner and classroom pedagogy designer.
 
 You generate lesson plans STRICTLY based on provided Knowledge Points (KPs).
 You must NOT introduce new concepts, objectives, terminology, or examples
@@ -19,16 +354,13 @@ that are not derivable from the given KPs.
 Always follow NCERT terminology and Class-appropriate pedagogy.
 
 Output ONE JSON object exactly matching the provided output schema.
-Do NOT add explanations, comments, or text outside JSON."""
+Do NOT add explanations, comments, or text outside JSON.""")
     
-    SESSION_CONTENT_SYSTEM = """Expert CBSE/NCERT lesson planner. Always output one JSON object exactly following the provided field names. No explanations, no text outside JSON. Keep age-appropriate, teacher-friendly tone."""
+    SESSION_CONTENT_SYSTEM = sys.intern("""Expert CBSE/NCERT lesson planner. Always output one JSON object exactly following the provided field names. No explanations, no text outside JSON. Keep age-appropriate, teacher-friendly tone.""")
     
-    QUESTIONS_SYSTEM = """You create CBSE/NCERT-aligned question papers. 
-Always output ONLY valid JSON that matches the user-given structure and counts. 
-Never add or remove questions. 
-Never modify marks per question."""
+    QUESTIONS_SYSTEM = sys.intern("""You create CBSE/NCERT-aligned question papers. Output ONLY valid JSON matching the given structure and counts; never add/remove questions or change marks.""")
     
-    KNOWLEDGE_POINTS_SYSTEM = """You are an expert curriculum architect and assessment scientist.
+    KNOWLEDGE_POINTS_SYSTEM = sys.intern("""You are an expert curriculum architect and assessment scientist.
 You specialize in CBSE/NCERT syllabus decomposition, competency-based education,
 Bloom's Taxonomy alignment, and Item Response Theory (IRT).
 
@@ -59,9 +391,9 @@ CONSTRAINT RULES:
    - Medium: -1.0 to +1.0
    - Hard: +1.0 to +2.0
    - Very Hard: +2.0 to +3.0
-6. kp_id must be stable and deterministic."""
+6. kp_id must be stable and deterministic.""")
     
-    SESSION_SUMMARY_SYSTEM = """You are an experienced school teacher preparing a lesson plan for another teacher.
+    SESSION_SUMMARY_SYSTEM = sys.intern("""You are an experienced school teacher preparing a lesson plan for another teacher.
 
 Your task is to create a concise instructional overview for a teaching session.
 
@@ -90,12 +422,13 @@ Expected JSON format:
 {
   "summary": "",
   "objectives": []
-}"""
+}""")
     
     @staticmethod
+    @lru_cache(maxsize=8)
     def get_kp_grouping_system_prompt(board: str = "CBSE") -> str:
         """Generate KP grouping system prompt with board context"""
-        board_context = f"{board}/NCERT" if board == "CBSE" else board
+        board_context = _BOARD_CONTEXT.get(board, board)
         return f"""You are an expert school curriculum planner specializing in {board_context} curriculum.
 
 Group the given knowledge points into the specified number of teaching sessions.
@@ -121,286 +454,291 @@ Return ONLY valid JSON in the following format:
   ]
 }}"""
     
-    STUDENT_TUTOR_SYSTEM = """You are an expert tutor for Indian school students (CBSE/NCERT curriculum). 
-Your role is to provide detailed, educational answers to student questions.
-
-Guidelines:
-- Provide clear, detailed explanations with step-by-step reasoning
-- Include practical examples and real-world applications
-- Use age-appropriate language for the student's level
-- Break down complex concepts into simpler parts
-- Encourage learning and curiosity
-- If the question is outside academic scope, politely redirect to educational topics
+    # Fixed system prompt lengths, so per-request prompt sizes only measure the user message
+    LESSON_PLAN_SYSTEM_LEN = len(LESSON_PLAN_SYSTEM)
+    SESSION_CONTENT_SYSTEM_LEN = len(SESSION_CONTENT_SYSTEM)
+    QUESTIONS_SYSTEM_LEN = len(QUESTIONS_SYSTEM)
+    KNOWLEDGE_POINTS_SYSTEM_LEN = len(KNOWLEDGE_POINTS_SYSTEM)
+    SESSION_SUMMARY_SYSTEM_LEN = len(SESSION_SUMMARY_SYSTEM)
+    
+    # Responses API output formats: lesson plans are held to their exact schema;
+    # the other outputs are too open-ended for strict mode, so they are only
+    # guaranteed to be a valid JSON object
+    LESSON_PLAN_OUTPUT_FORMAT = {"format": {
+        "type": "json_schema",
+        "name": "lesson_plan",
+        "schema": LessonPlanOutput.model_json_schema(),
+        "strict": True
+    }}
+    LESSON_PLAN_BATCH_OUTPUT_FORMAT = {"format": {
+        "type": "json_schema",
+        "name": "lesson_plan_batch",
+        "schema": LessonPlanBatchOutput.model_json_schema(),
+        "strict": True
+    }}
+    LESSON_PLAN_SESSION_OUTPUT_FORMAT = {"format": {
+        "type": "json_schema",
+        "name": "lesson_plan_session",
+        "schema": LessonPlanSession.model_json_schema(),
+        "strict": True
+    }}
+    JSON_OUTPUT_FORMAT = {"format": {"type": "json_object"}}
+    
+    STUDENT_TUTOR_SYSTEM = """Expert CBSE/NCERT tutor for Indian school students. Give clear, step-by-step, age-appropriate explanations with practical examples; break complex ideas into simpler parts.
+Be encouraging and patient. Stay on academic topics and politely redirect anything else.
 
 {subject_context}
-{class_context}
-
-Always be encouraging, patient, and thorough in your explanations."""
+{class_context}"""
+    
+    CONVERSATION_SUMMARY_SYSTEM = sys.intern("""You condense tutoring conversations between a student and a tutor.
+Summarize the conversation so far in at most 200 tokens: the topics and questions the student raised, what was explained, and anything left unresolved. Plain text only.""")
+    
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def get_system_message(content: str) -> Dict[str, str]:
+        """Return the system message for a system prompt, built once per prompt
+        
+        The dict is shared by every request using that prompt, so callers must
+        not modify it.
+        """
+        return {"role": "system", "content": content}
     
     @staticmethod
+    @lru_cache(maxsize=512)
     def get_lesson_plan_prompt(subject_name: str, class_name: str, chapter_title: str, 
                               number_of_sessions: int, default_session_duration: str) -> str:
         """Generate lesson plan prompt"""
-        return f"""Generate {number_of_sessions} sequential sessions for {subject_name} Class {class_name}, Chapter: "{chapter_title}"
-
-Each session includes: 
-- title (clear),
-- summary (1-2 sentences),
-- duration ("{default_session_duration}"),
-- 3-4 objectives.
-
-Format:
-[{{"sessionNumber": 1, "title": "", "summary": "", "duration": "{default_session_duration}", "objectives": []}}]"""
+        return _LESSON_PLAN_PREFIX + _LESSON_PLAN_REQUEST.substitute(
+            number_of_sessions=number_of_sessions,
+            subject_name=subject_name,
+            class_name=class_name,
+            chapter_title=chapter_title,
+            default_session_duration=default_session_duration
+        )
     
     @staticmethod
-    def get_session_content_prompt(title: str, subject_name: str, class_name: str, duration: str, summary: str, objectives: List[str], kp_list_with_description: str) -> str:
-        """Generate detailed session content prompt"""
-        return f"""Generate a detailed lesson plan for:
-Session Title: {title}
-Subject: {subject_name}
-Class: {class_name} standard
-Duration: {duration}
-Instructional Summary:
-{summary}
-Learning Objectives:
-{objectives}
-Knowledge Points to be covered in this session:
-{kp_list_with_description}
-Output JSON keys (fill with relevant content, no placeholders):
-{{
-  "teachingScript": {{ "overview": "", "stepByStep": [{{ "time": "", "teacherLines": "", "studentActivity": "" }}], "transitions": "" }},
-  "boardWorkPlan": {{ "definitions": [], "lawsOrRules": [{{ "name": "", "statement": "", "notation": "" }}], "diagramsToDraw": [{{ "label": "", "instructions": "", "placeholderTag": "" }}], "keywords": [] }},
-  "detailedExplanations": {{ "subtopics": [{{ "title": "", "explanation": "", "example": "", "diagram": "", "comparisonTable": {{ "useIfRelevant": false, "headers": [], "rows": [] }}, "classroomTips": "" }}], "formulasAndDerivations": [] }},
-  "activities": {{ "warmUpHook": "", "interactive": [{{ "name": "", "type": "", "steps": [], "time": "", "materials": [], "expectedOutcome": "" }}], "practiceProblems": [{{ "problem": "", "difficulty": "", "answer": "" }}], "groupWork": {{ "task": "", "roles": [], "successCriteria": "" }}, "experiments": [] }},
-  "wrapUp": {{ "summary": [], "engagementQuestions": [], "closureActivity": "" }},
-  "quickAssessment": {{ "fiveQandA": [{{ "q": "", "a": "" }}], "formatHints": "" }},
-  "assessment": {{ "exitTicket": "", "homework": "", "rubricOrMarkingHints": "" }},
-  "resources": {{ "materials": [], "references": [], "additionalReadingOrMedia": [], "youtubeSearchKeywords": [] }},
-  "differentiation": {{ "strugglingLearners": "", "advancedStudents": "", "multipleLearningStyles": "" }}
-}}"""
+    def get_lesson_plans_batch_prompt(plans: List[Dict[str, Any]]) -> str:
+        """Generate a prompt that creates several lesson plans in one call
+        
+        Each plan needs subject_name, class_name, chapter_title, number_of_sessions
+        and default_session_duration. The session format is sent once; the model
+        returns {"results": [{"requestId": i, "sessions": [...]}]} with 1-based request IDs.
+        """
+        if not plans:
+            raise ValueError("At least one lesson plan request is required")
+        if len(plans) > PromptTemplates.MAX_LESSON_PLAN_BATCH_SIZE:
+            raise ValueError(
+                f"At most {PromptTemplates.MAX_LESSON_PLAN_BATCH_SIZE} lesson plans can be batched per call"
+            )
+        
+        blocks = [
+            f"### Request {i}\n" + _LESSON_PLAN_REQUEST.substitute(plan)
+            for i, plan in enumerate(plans, 1)
+        ]
+        return _LESSON_PLAN_BATCH_PREFIX + "\n\n".join(blocks)
+    
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def get_lesson_plan_session_prompt(subject_name: str, class_name: str, chapter_title: str,
+                                       session_number: int, number_of_sessions: int,
+                                       default_session_duration: str) -> str:
+        """Generate the prompt for one session of a lesson plan"""
+        return _LESSON_PLAN_SESSION_PREFIX + _LESSON_PLAN_SESSION_REQUEST.substitute(
+            session_number=session_number,
+            number_of_sessions=number_of_sessions,
+            subject_name=subject_name,
+            class_name=class_name,
+            chapter_title=chapter_title,
+            default_session_duration=default_session_duration
+        )
+    
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def get_session_content_prompt(title: str, subject_name: str, class_name: str, duration: str, summary: str, objectives: str, kp_list_with_description: str) -> str:
+        """Generate detailed session content prompt
+        
+        objectives and kp_list_with_description are pre-formatted text (one
+        "- " line per objective), so every argument is hashable for the cache.
+        """
+        # Assemble in one join so the large static prefix is copied only once
+        return "".join((
+            _SESSION_CONTENT_PREFIX,
+            *_session_content_parts(title, subject_name, class_name, duration, summary,
+                                    objectives, kp_list_with_description)
+        ))
+    
+    @staticmethod
+    def get_session_contents_batch_prompt(sessions: List[Dict[str, str]]) -> str:
+        """Generate one prompt that produces detailed content for several sessions
+        
+        Each session needs title, subject_name, class_name, duration, summary,
+        objectives and kp_list_with_description (the last two pre-formatted).
+        The schema is sent once; the model returns {"sessions": [...]} in order.
+        """
+        if not sessions:
+            raise ValueError("At least one session is required")
+        if len(sessions) > PromptTemplates.MAX_SESSION_CONTENT_BATCH_SIZE:
+            raise ValueError(
+                f"At most {PromptTemplates.MAX_SESSION_CONTENT_BATCH_SIZE} sessions can be generated per call"
+            )
+        
+        parts = [_SESSION_CONTENT_BATCH_PREFIX]
+        for i, session in enumerate(sessions, 1):
+            if i > 1:
+                parts.append("\n\n")
+            parts.append(f"### Session {i}\n")
+            parts.extend(_session_content_parts(
+                session["title"], session["subject_name"], session["class_name"], session["duration"],
+                session["summary"], session["objectives"], session["kp_list_with_description"]
+            ))
+        return "".join(parts)
     
     @staticmethod
     def get_questions_prompt(class_name: str, subject_name: str, chapters: List[str], total_marks: int, allocation: Dict[str, Any]) -> str:
         """Generate questions creation prompt"""
-        chapters_text = ", ".join(chapters)
+        # Lists/dicts are not hashable, so freeze them before hitting the cache
+        return _render_questions_prompt(
+            class_name, subject_name, tuple(chapters), total_marks, tuple(sorted(allocation.items()))
+        )
+    
+    @staticmethod
+    def build_questions_request(class_name: str, subject_name: str, chapters: List[str], total_marks: int,
+                                allocation: Dict[str, Any]) -> Tuple[str, str]:
+        """Return (system message, user message) for a questions request, as sent to responses.create"""
+        user_message = PromptTemplates.get_questions_prompt(
+            class_name=class_name,
+            subject_name=subject_name,
+            chapters=chapters,
+            total_marks=total_marks,
+            allocation=allocation
+        )
+        return PromptTemplates.QUESTIONS_SYSTEM, user_message
+    
+    @staticmethod
+    def get_questions_batch_prompt(requests: List[Dict[str, Any]]) -> str:
+        """Generate a prompt that creates several question papers in one call
         
-        countA = allocation["A"]
-        countB = allocation["B"]
-        countC = allocation["C"]
-        countD = allocation["D"]
-        countE = allocation["E"]
-
-        prompt = f"""
-Create a Class {class_name} {subject_name} question paper from these chapters:
-{chapters_text}
-
-Total marks: {total_marks}
-
-Use EXACTLY this many questions (computed by backend):
-
-A: {countA} MCQ (1 mark each)
-B: {countB} VSA (2 marks each)
-C: {countC} SA (3 marks each)
-D: {countD} LA (5 marks each)
-E: {countE} CASE (4 marks each, each CASE must contain 3 sub-questions: 1m, 1m, 2m)
-
-Rules:
-- Maintain difficulty split: Easy 40%, Medium 40%, Hard 20%.
-- All questions must be NCERT-based and conceptually correct.
-- Do NOT change counts/marks.
-- Output ONLY JSON in this structure:
-
-{{
-  "sections": [
-    {{
-      "sectionName": "A",
-      "description": "Multiple Choice Questions",
-      "questions": [
-        {{ "qNo": 1, "questionText": "", "marks": 1, "difficulty": "", "type": "MCQ", "options": ["", "", "", ""], "correctAnswer": "" }}
-      ]
-    }},
-    {{
-      "sectionName": "B",
-      "description": "Very Short Answer Questions",
-      "questions": [
-        {{ "qNo": 1, "questionText": "", "marks": 2, "difficulty": "", "type": "VSA", "answerHints": "" }}
-      ]
-    }},
-    {{
-      "sectionName": "C",
-      "description": "Short Answer Questions",
-      "questions": [
-        {{ "qNo": 1, "questionText": "", "marks": 3, "difficulty": "", "type": "SA", "answerHints": "" }}
-      ]
-    }},
-    {{
-      "sectionName": "D",
-      "description": "Long Answer Questions",
-      "questions": [
-        {{ "qNo": 1, "questionText": "", "marks": 5, "difficulty": "", "type": "LA", "answerHints": "" }}
-      ]
-    }},
-    {{
-      "sectionName": "E",
-      "description": "Case-Based / Source-Based Questions",
-      "questions": [
-        {{ 
-          "qNo": 1, 
-          "caseText": "",
-          "type": "CASE",
-          "subQuestions": [
-            {{ "subQNo": "a", "questionText": "", "marks": 1, "answerHints": "" }},
-            {{ "subQNo": "b", "questionText": "", "marks": 1, "answerHints": "" }},
-            {{ "subQNo": "c", "questionText": "", "marks": 2, "answerHints": "" }}
-          ]
-        }}
-      ]
-    }}
-  ],
-  "instructions": [
-    "All questions are compulsory.",
-    "Answer the questions in sequence.",
-    "Use diagrams wherever necessary.",
-    "No overall choice, but internal choices may be given."
-  ]
-}}"""
-        return prompt
+        Each request needs class_name, subject_name, chapters, total_marks and
+        allocation. The shared schema and rules are sent once; the model returns
+        {"results": [{"requestId": i, "paper": {...}}]} with 1-based request IDs.
+        """
+        if not requests:
+            raise ValueError("At least one question paper request is required")
+        if len(requests) > PromptTemplates.MAX_QUESTIONS_BATCH_SIZE:
+            raise ValueError(
+                f"At most {PromptTemplates.MAX_QUESTIONS_BATCH_SIZE} question papers can be batched per call"
+            )
+        
+        blocks = [
+            f"### Request {i}\n" + _questions_request_block(
+                req["class_name"], req["subject_name"], req["chapters"], req["total_marks"], req["allocation"]
+            )
+            for i, req in enumerate(requests, 1)
+        ]
+        return _QUESTIONS_BATCH_PREFIX + "\n\n".join(blocks)
+    
+    @staticmethod
+    def iter_batch_jsonl(requests: Iterable[BatchReq]) -> Iterator[bytes]:
+        """Yield one Batch API JSONL line per request, so large uploads can be streamed"""
+        for req in requests:
+            body = {
+                "model": req["model"],
+                "input": [
+                    {"role": "system", "content": req["system"]},
+                    {"role": "user", "content": req["user"]}
+                ],
+                "text": PromptTemplates.JSON_OUTPUT_FORMAT
+            }
+            if "metadata" in req:
+                body["metadata"] = req["metadata"]
+            yield orjson.dumps({
+                "custom_id": req["custom_id"],
+                "method": "POST",
+                "url": "/v1/responses",
+                "body": body
+            }) + b"\n"
+    
+    @staticmethod
+    def to_batch_jsonl(requests: Iterable[BatchReq]) -> bytes:
+        """Serialize requests into a Batch API input file"""
+        return b"".join(PromptTemplates.iter_batch_jsonl(requests))
     
     @staticmethod
+    @lru_cache(maxsize=512)
     def get_student_tutor_system_prompt(subject_name: str = None, class_name: str = None) -> str:
-        """Generate student tutor system prompt with context"""
+        """Generate student tutor system prompt with context
+        
+        The per-student context is kept at the end of the prompt so the static
+        guidelines form a shared prefix for provider-side prompt caching.
+        """
         subject_context = f"Subject context: {subject_name}" if subject_name else ""
         class_context = f"Class/Grade: {class_name}" if class_name else ""
         
-        return PromptTemplates.STUDENT_TUTOR_SYSTEM.format(
+        return sys.intern(PromptTemplates.STUDENT_TUTOR_SYSTEM.format(
             subject_context=subject_context,
             class_context=class_context
-        )
+        ).rstrip())
+
+    @staticmethod
+    def get_conversation_summary_prompt(turns: List[Dict[str, str]]) -> str:
+        """List earlier conversation turns as a transcript for summarization"""
+        return "\n\n".join(f"{turn.get('role', 'user')}: {turn.get('content', '')}" for turn in turns)
 
     @staticmethod
+    @lru_cache(maxsize=512)
     def get_knowledge_points_prompt(grade: int, subject: str, chapter: str, section: str = None) -> str:
         """Generate knowledge points decomposition prompt - simplified to AI-only KP generation"""
         section_spec = f"Section: {section}" if section else "All sections in chapter"
         
-        return f"""Decompose the curriculum into atomic, teachable Knowledge Points (KPs).
-
-CURRICULUM INPUT:
-- Grade: {grade}
-- Subject: {subject}
-- Chapter: {chapter}
-- Scope: {section_spec}
-
-RETURN ONLY this JSON structure (no syllabus wrapper):
-
-{{
-  "knowledge_points": [
-    {{
-      "section_title": "<section name>",
-      "kp_title": "<concise action-oriented title>",
-      "kp_description": "<what the student must demonstrably do>",
-      "bloom_level": "Remember | Understand | Apply | Analyze | Evaluate | Create",
-      "irt_difficulty": <float -3.0 to +3.0>,
-      "difficulty_label": "Very Easy | Easy | Medium | Hard | Very Hard",
-      "prerequisite_kps": ["<prerequisite_id_1>", "..."] or [],
-      "misconception_tags": ["<tag>", "..."],
-      "assessment_examples": ["<example 1>", "<example 2>"],
-      "detailed_explanation": "<100-150 word explanation>",
-      "auto_grading_components": {{
-        "conceptual_triples": [{{"triple": "<subject, predicate, object>"}}],
-        "key_terms_and_synonyms": [
-          {{"term": "<key term>", "synonyms": ["<synonym 1>", "<synonym 2>"]}}
-        ],
-        "assessment_criteria": [
-          {{"criterion": "<criterion>", "weightage": <int 0-100>}}
-        ]
-      }},
-      "tags": ["<tag1>", "<tag2>", "<tag3>"],
-      "real_world_applications": ["<application 1>", "<application 2>"]
-    }}
-  ]
-}}
-
-GUIDELINES:
-1. Each KP = ONE clear cognitive skill (atomic)
-2. Ordered by prerequisite dependency
-3. Bloom level must match action verbs
-4. IRT difficulty increases with abstraction
-5. Assessment examples = exactly 2
-6. Assessment criteria weightages sum to 100%
-7. Use NCERT terminology for {subject} Grade {grade}
-8. Prerequisite KPs reference placeholder IDs (server will generate final IDs)
-"""
+        return _KNOWLEDGE_POINTS_PREFIX + _KNOWLEDGE_POINTS_REQUEST.substitute(
+            grade=grade,
+            subject=subject,
+            chapter=chapter,
+            section_spec=section_spec
+        )
 
     @staticmethod
     def get_kp_grouping_prompt(board: str, chapter: str, class_name: str, subject: str, 
                               number_of_sessions: int, session_duration: str,
                               knowledge_points: List[Dict[str, Any]]) -> str:
-        """Generate KP grouping into sessions prompt"""
+        """Generate KP grouping into sessions prompt
+        
+        KPs are listed in request order, which is their teaching and prerequisite order.
+        """
         kps_formatted = "\n".join([
             f"  - {kp['kp_id']}: {kp['title']} (Difficulty: {kp['difficulty']}, "
-            f"Cognitive: {kp['cognitive_level']}, Prerequisites: {kp['prerequisites']})"
+            f"Cognitive: {kp['cognitive_level']}, Prerequisites: {orjson.dumps(kp['prerequisites']).decode()})"
             for kp in knowledge_points
         ])
         
-        board_context = f"{board}/NCERT" if board == "CBSE" else board
+        board_context = _BOARD_CONTEXT.get(board, board)
         
-        return f"""Group the following knowledge points into {number_of_sessions} teaching sessions.
-
-Board: {board_context}
-Chapter: {chapter}
-Class: {class_name}
-Subject: {subject}
-Session Duration: {session_duration}
-
-Knowledge Points:
-{kps_formatted}
-
-Provide {number_of_sessions} sessions with coherent grouping that respects:
-1. Prerequisite dependencies (prerequisites must come in earlier sessions)
-2. Cognitive progression (easier → harder)
-3. Conceptual coherence within each session
-4. Balanced distribution across sessions
-5. {board_context} curriculum standards and terminology
-
-Return ONLY JSON in this exact format:
-{{
-  "sessions": [
-    {{
-      "session_number": 1,
-      "session_title": "...",
-      "kp_ids": ["1", "2", "3"]
-    }}
-  ]
-}}"""
+        return _KP_GROUPING_PREFIX + _KP_GROUPING_REQUEST.substitute(
+            number_of_sessions=number_of_sessions,
+            board_context=board_context,
+            chapter=chapter,
+            class_name=class_name,
+            subject=subject,
+            session_duration=session_duration,
+            kps_formatted=kps_formatted
+        )
 
     @staticmethod
     def get_session_summary_prompt(board: str, chapter: str, class_name: str, subject: str,
                                    session_title: str, knowledge_points: List[Dict[str, Any]]) -> str:
-        """Generate session summary prompt"""
-        board_context = f"{board}/NCERT" if board == "CBSE" else board
+        """Generate session summary prompt, with KPs listed in request order"""
+        board_context = _BOARD_CONTEXT.get(board, board)
         
         kps_formatted = "\n".join([
             f"  - {kp['title']} (Cognitive Level: {kp['cognitive_level']}, Difficulty: {kp['difficulty']})"
             for kp in knowledge_points
         ])
         
-        return f"""Context:
-- Board: {board_context}
-- Chapter: {chapter}
-- Class: {class_name}
-- Subject: {subject}
-- Session Title: {session_title}
-
-Knowledge Points included in this session:
-{kps_formatted}
-
-Task:
-Create a concise instructional overview for this session consisting of:
-1. A short session summary (2-4 sentences)
-2. A list of instructional objectives (2-4 objectives)
-
-Return ONLY JSON in this exact format:
-{{
-  "summary": "",
-  "objectives": []
-}}"""
+        return _SESSION_SUMMARY_PREFIX + _SESSION_SUMMARY_REQUEST.substitute(
+            board_context=board_context,
+            chapter=chapter,
+            class_name=class_name,
+            subject=subject,
+            session_title=session_title,
+            kps_formatted=kps_formatted
+        )
@@ -1,5 +1,8 @@
+import hashlib
 import logging
-from fastapi import APIRouter, HTTPException, status
+
+import orjson
+from fastapi import APIRouter, Request, Response, status
 
 from models import HealthResponse
 
@@ -7,6 +10,11 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# The health payload never changes, so encode it once
+_HEALTHY_BODY = orjson.dumps(HealthResponse(status="healthy", message="API is operational").model_dump())
+_HEALTHY_ETAG = f'"{hashlib.md5(_HEALTHY_BODY).hexdigest()}"'
+_HEALTHY_HEADERS = {"ETag": _HEALTHY_ETAG, "Cache-Control": "max-age=1"}
+
 
 @router.get("/", response_model=HealthResponse)
 async def root():
@@ -18,17 +26,14 @@ async def root():
 
 
 @router.get("/health", response_model=HealthResponse)
-async def health_check():
-    """Health check endpoint"""
-    try:
-        # Basic health check - could be extended to check OpenAI connectivity
-        return HealthResponse(
-            status="healthy", 
-            message="API is operational"
-        )
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Service unavailable"
-        )
\ No newline at end of file
+async def health_check(request: Request):
+    """Health check endpoint
+    
+    Serves a precomputed body with an ETag, so frequent load balancer polls skip
+    model construction and encoding and can be answered with 304 Not Modified.
+    """
+    # Basic health check - dependency checks (e.g. OpenAI connectivity) belong in
+    # a background task that caches its result, not in this hot path
+    if request.headers.get("if-none-match") == _HEALTHY_ETAG:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_HEALTHY_HEADERS)
+    return Response(_HEALTHY_BODY, media_type="application/json", headers=_HEALTHY_HEADERS)
\ No newline at end of file
@@ -1,40 +1,103 @@
 import logging
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
 
-from models import KnowledgePointRequest, APIResponse
+from dependencies import get_openai_service
+from models import KnowledgePointRequest, KnowledgePointsBulkRequest, KnowledgePointsBatchRequest, APIResponse
 from services.openai_service import OpenAIService
+from services.prompt_cache import get_or_compute, request_cache_key
+from utils.request_limiter import openai_request_limiter
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api", tags=["knowledge-points"])
-
-# Initialize OpenAI service
-openai_service = OpenAIService()
+router = APIRouter(prefix="/api", tags=["knowledge-points"], dependencies=[Depends(openai_request_limiter)])
 
 
 @router.post("/generate-knowledge-points", response_model=APIResponse)
-async def generate_knowledge_points(request: KnowledgePointRequest):
+async def generate_knowledge_points(request: KnowledgePointRequest,
+                                    openai_service: OpenAIService = Depends(get_openai_service)):
     """
     Generate knowledge points for a curriculum chapter using OpenAI API
     
     This endpoint decomposes curriculum content into atomic, teachable,
     and assessable Knowledge Points (KPs) aligned with CBSE/NCERT standards,
     Bloom's Taxonomy, and Item Response Theory (IRT) difficulty metrics.
+    The result holds the board/grade/subject/chapter once under "meta" and
+    the KPs, each with its kp_id, under "knowledge_points".
     """
     try:
-        logger.info(f"Generating knowledge points for {request.board} - {request.subject} Grade {request.grade}, Chapter: {request.chapter}")
+        logger.info("Generating knowledge points for %s - %s Grade %s, Chapter: %s", request.board, request.subject, request.grade, request.chapter)
         
         # Call OpenAI service
-        success, parsed_result, error = await openai_service.generate_knowledge_points(
-            board=request.board,
-            grade=request.grade,
-            subject=request.subject,
-            chapter=request.chapter,
-            section=request.section
+        cache_key = ("knowledge_points", request.board, request.grade, request.subject,
+                     request.chapter, request.section)
+        success, parsed_result, error = await get_or_compute(
+            cache_key,
+            lambda: openai_service.generate_knowledge_points(
+                board=request.board,
+                grade=request.grade,
+                subject=request.subject,
+                chapter=request.chapter,
+                section=request.section
+            )
+        )
+        
+        if not success:
+            logger.error("Failed to parse knowledge points response: %s", error)
+            return APIResponse(
+                success=False,
+                message="Failed to parse AI response",
+                error=f"JSON parsing error: {error}",
+                data={"raw_response": parsed_result}  # Include raw response for debugging
+            )
+        
+        return APIResponse(
+            success=True,
+            data=parsed_result,
+            message="Knowledge points generated successfully"
+        )
+        
+    except ValueError as ve:
+        logger.error("Configuration error: %s", ve)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service configuration error"
+        )
+    except Exception as e:
+        logger.error("Error generating knowledge points: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to generate knowledge points",
+            error=str(e)
+        )
+
+
+@router.post("/generate-knowledge-points-bulk", response_model=APIResponse)
+async def generate_knowledge_points_bulk(request: KnowledgePointsBulkRequest,
+                                         openai_service: OpenAIService = Depends(get_openai_service)):
+    """
+    Generate knowledge points for several sections of a chapter at once
+    
+    Each section is generated with its own OpenAI call and the calls run
+    concurrently. The result has the same shape as /generate-knowledge-points,
+    with the sections' KPs in request order and kp_ids numbered across them.
+    """
+    try:
+        logger.info("Generating knowledge points for %d sections of %s - %s Grade %s, Chapter: %s",
+                    len(request.sections), request.board, request.subject, request.grade, request.chapter)
+        
+        success, parsed_result, error = await get_or_compute(
+            request_cache_key("knowledge_points_bulk", request.model_dump()),
+            lambda: openai_service.generate_knowledge_points_bulk(
+                board=request.board,
+                grade=request.grade,
+                subject=request.subject,
+                chapter=request.chapter,
+                sections=request.sections
+            )
         )
         
         if not success:
-            logger.error(f"Failed to parse knowledge points response: {error}")
+            logger.error("Failed to parse knowledge points response: %s", error)
             return APIResponse(
                 success=False,
                 message="Failed to parse AI response",
@@ -49,15 +112,61 @@ async def generate_knowledge_points(request: KnowledgePointRequest):
         )
         
     except ValueError as ve:
-        logger.error(f"Configuration error: {str(ve)}")
+        logger.error("Configuration error: %s", ve)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Service configuration error"
         )
     except Exception as e:
-        logger.error(f"Error generating knowledge points: {str(e)}")
+        logger.error("Error generating knowledge points: %s", e)
         return APIResponse(
             success=False,
             message="Failed to generate knowledge points",
             error=str(e)
         )
+
+
+@router.post("/generate-knowledge-points-batch", response_model=APIResponse)
+async def generate_knowledge_points_batch(request: KnowledgePointsBatchRequest,
+                                          openai_service: OpenAIService = Depends(get_openai_service)):
+    """
+    Submit knowledge point generation for many chapters/sections as one OpenAI Batch API job
+    
+    Meant for bulk syllabus ingestion: batch jobs complete asynchronously
+    (within 24 hours) at about half the cost of individual calls. Poll
+    GET /api/batch/{batch_id} for the results; each result's custom_id is
+    the job's index in the submitted list, and its data has the same shape
+    as /generate-knowledge-points.
+    """
+    try:
+        logger.info("Submitting knowledge points batch for %d jobs", len(request.jobs))
+        
+        success, result, error = await openai_service.submit_knowledge_points_batch(request.jobs)
+        
+        if not success:
+            logger.error("Failed to submit knowledge points batch: %s", error)
+            return APIResponse(
+                success=False,
+                message="Failed to submit knowledge points batch",
+                error=error
+            )
+        
+        return APIResponse(
+            success=True,
+            data=result,
+            message="Knowledge points batch submitted successfully"
+        )
+        
+    except ValueError as ve:
+        logger.error("Configuration error: %s", ve)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service configuration error"
+        )
+    except Exception as e:
+        logger.error("Error submitting knowledge points batch: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to submit knowledge points batch",
+            error=str(e)
+        )
@@ -1,21 +1,32 @@
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException, status
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 
+from dependencies import get_openai_service, get_youtube_helper
 from helpers.youtube import YouTubeHelper
-from models import LessonPlanRequest, DetailedSessionRequest, GroupKPsRequest, SessionSummaryRequest, APIResponse
+from models import LessonPlanRequest, LessonPlansBatchRequest, DetailedSessionRequest, DetailedSessionsBatchRequest, GroupKPsRequest, SessionSummaryRequest, SessionSummariesBatchRequest, APIResponse
+from prompts import PromptTemplates
 from services.openai_service import OpenAIService
+from services.prompt_cache import get_or_compute, request_cache_key
+from utils.json_parser import JSONParser
+from utils.request_limiter import openai_request_limiter
+from utils.streaming import start_stream
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api", tags=["lesson-planning"])
+router = APIRouter(prefix="/api", tags=["lesson-planning"], dependencies=[Depends(openai_request_limiter)])
 
-# Initialize OpenAI service
-openai_service = OpenAIService()
-youtube_service = YouTubeHelper()
+
+def _sse_event(event: str, data) -> bytes:
+    """Format one server-sent event with a JSON-encoded data line"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
 
 
 @router.post("/generate-lesson-plan", response_model=APIResponse)
-async def generate_lesson_plan(request: LessonPlanRequest):
+async def generate_lesson_plan(request: LessonPlanRequest,
+                               openai_service: OpenAIService = Depends(get_openai_service)):
     """
     Generate a lesson plan using OpenAI API
     
@@ -24,10 +35,11 @@ async def generate_lesson_plan(request: LessonPlanRequest):
     This provides the summary/overview of the lesson plan.
     """
     try:
-        logger.info(f"Generating lesson plan for {request.subject_name} - {request.chapter_title}")
+        logger.info("Generating lesson plan for %s - %s", request.subject_name, request.chapter_title)
         
-        # Call OpenAI service
-        success, parsed_result, error = await openai_service.generate_lesson_plan(
+        # Longer plans are generated one session per concurrent call; identical
+        # prompts are answered from the service's response cache
+        success, parsed_result, error = await openai_service.generate_lesson_plan_sharded(
             subject_name=request.subject_name,
             class_name=request.class_name,
             chapter_title=request.chapter_title,
@@ -36,7 +48,7 @@ async def generate_lesson_plan(request: LessonPlanRequest):
         )
         
         if not success:
-            logger.error(f"Failed to parse lesson plan response: {error}")
+            logger.error("Failed to parse lesson plan response: %s", error)
             return APIResponse(
                 success=False,
                 message="Failed to parse AI response",
@@ -51,22 +63,106 @@ async def generate_lesson_plan(request: LessonPlanRequest):
         )
         
     except ValueError as ve:
-        logger.error(f"Configuration error: {str(ve)}")
+        logger.error("Configuration error: %s", ve)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service configuration error"
+        )
+    except Exception as e:
+        logger.error("Error generating lesson plan: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to generate lesson plan",
+            error=str(e)
+        )
+
+
+@router.post("/generate-lesson-plans", response_model=APIResponse)
+async def generate_lesson_plans_batch(request: LessonPlansBatchRequest,
+                                      openai_service: OpenAIService = Depends(get_openai_service)):
+    """
+    Generate several lesson plans, packing up to 5 into each OpenAI call
+    
+    Same lesson plans as /generate-lesson-plan, but each call sends the session
+    format once and returns several plans, so a term's worth of chapters needs
+    far fewer requests. Plans are returned in request order.
+    """
+    try:
+        logger.info("Generating %s lesson plans", len(request.plans))
+        
+        success, lesson_plans, error = await openai_service.generate_lesson_plans_bulk(request.plans)
+        
+        if not success:
+            logger.error("Failed to parse batched lesson plan response: %s", error)
+            return APIResponse(
+                success=False,
+                message="Failed to parse AI response",
+                error=f"JSON parsing error: {error}",
+                data={"raw_response": lesson_plans}  # Include raw response for debugging
+            )
+        
+        return APIResponse(
+            success=True,
+            data={"lesson_plans": lesson_plans},
+            message="Lesson plans generated successfully"
+        )
+        
+    except ValueError as ve:
+        logger.error("Configuration error: %s", ve)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service configuration error"
+        )
+    except Exception as e:
+        logger.error("Error generating lesson plans: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to generate lesson plans",
+            error=str(e)
+        )
+
+
+@router.post("/generate-lesson-plan/stream")
+async def stream_lesson_plan(request: LessonPlanRequest,
+                             openai_service: OpenAIService = Depends(get_openai_service)):
+    """
+    Stream a lesson plan as it is generated
+    
+    Returns the raw JSON text from OpenAI chunk by chunk, so the client can start
+    receiving data before generation finishes. The body is a {"sessions": [...]}
+    object holding the same sessions as /generate-lesson-plan's lesson_plan.
+    Failures before the first chunk return the usual APIResponse error.
+    """
+    try:
+        logger.info("Streaming lesson plan for %s - %s", request.subject_name, request.chapter_title)
+        chunks = await start_stream(openai_service.stream_lesson_plan(
+            subject_name=request.subject_name,
+            class_name=request.class_name,
+            chapter_title=request.chapter_title,
+            number_of_sessions=request.number_of_sessions,
+            default_session_duration=request.default_session_duration
+        ))
+    except ValueError as ve:
+        logger.error("Configuration error: %s", ve)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Service configuration error"
         )
     except Exception as e:
-        logger.error(f"Error generating lesson plan: {str(e)}")
+        logger.error("Error streaming lesson plan: %s", e)
         return APIResponse(
             success=False,
             message="Failed to generate lesson plan",
             error=str(e)
         )
+    
+    return StreamingResponse(chunks, media_type="application/json")
 
 
 @router.post("/generate-detailed-content-for-session", response_model=APIResponse)
-async def generate_session_content(request: DetailedSessionRequest):
+async def generate_session_content(request: DetailedSessionRequest,
+                                   openai_service: OpenAIService = Depends(get_openai_service),
+                                   youtube_service: YouTubeHelper = Depends(get_youtube_helper)):
     """
     Generate detailed content for a specific session using OpenAI API
     
@@ -77,25 +173,46 @@ async def generate_session_content(request: DetailedSessionRequest):
     Returns the raw JSON response from OpenAI for the UI to parse and handle.
     """
     try:
-        logger.info(f"Generating session content for: {request.title}")
+        logger.info("Generating session content for: %s", request.title)
         
-        # Call OpenAI service to get response
-        response = await openai_service.generate_detailed_session_content(
-            title=request.title,
-            subject_name=request.subject_name,
-            class_name=request.class_name,
-            duration=request.duration,
-            summary=request.summary,
-            objectives=request.objectives,
-            kp_list_with_description=request.kp_list
+        # Start a speculative video search on the session title while OpenAI is
+        # generating; it is merged with the keyword search results afterwards
+        prefetch_task = asyncio.create_task(
+            youtube_service.search_videos_by_keywords_async([f"{request.subject_name} {request.title}"])
         )
+        try:
+            # Call OpenAI service to get response
+            success, response, error = await openai_service.generate_detailed_session_content(
+                title=request.title,
+                subject_name=request.subject_name,
+                class_name=request.class_name,
+                duration=request.duration,
+                summary=request.summary,
+                objectives=request.objectives,
+                kp_list_with_description=request.kp_list
+            )
+            
+            if not success:
+                logger.error("Failed to parse session content response: %s", error)
+                return APIResponse(
+                    success=False,
+                    message="Failed to parse AI response",
+                    error=f"JSON parsing error: {error}",
+                    data={"raw_response": response}  # Include raw response for debugging
+                )
 
-        keywords = response["resources"]["youtubeSearchKeywords"]
-        youtube_results = youtube_service.search_videos_by_keywords(keywords)
+            keywords = response["resources"]["youtubeSearchKeywords"]
+            keyword_results, prefetched_results = await asyncio.gather(
+                youtube_service.search_videos_by_keywords_async(keywords),
+                prefetch_task
+            )
+            youtube_results = YouTubeHelper.merge_search_results(keyword_results, prefetched_results)
+        finally:
+            prefetch_task.cancel()
 
         response["resources"]["youtubeVideos"] = youtube_results
         
-        logger.info(f"Generated session content for: {request.title}")
+        logger.info("Generated session content for: %s", request.title)
         return APIResponse(
             success=True,
             data={
@@ -112,13 +229,142 @@ async def generate_session_content(request: DetailedSessionRequest):
         )
         
     except ValueError as ve:
-        logger.error(f"Configuration error: {str(ve)}")
+        logger.error("Configuration error: %s", ve)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Service configuration error"
         )
     except Exception as e:
-        logger.error(f"Error generating session content: {str(e)}")
+        logger.error("Error generating session content: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to generate session content",
+            error=str(e)
+        )
+
+
+@router.post("/generate-detailed-content-for-session/stream")
+async def stream_session_content(request: DetailedSessionRequest,
+                                 openai_service: OpenAIService = Depends(get_openai_service),
+                                 youtube_service: YouTubeHelper = Depends(get_youtube_helper)):
+    """
+    Stream detailed session content as server-sent events
+    
+    Each "delta" event carries the next piece of the session content JSON text
+    as a JSON string. Once generation finishes, the content is parsed and a
+    "videos" event carries {"youtubeVideos": [...]} for its search keywords;
+    an "error" event is sent instead if generation or parsing fails.
+    """
+    logger.info("Streaming session content for: %s", request.title)
+
+    async def events():
+        prefetch_task = asyncio.create_task(
+            youtube_service.search_videos_by_keywords_async([f"{request.subject_name} {request.title}"])
+        )
+        parts = []
+        try:
+            async for delta in openai_service.stream_detailed_session_content(
+                title=request.title,
+                subject_name=request.subject_name,
+                class_name=request.class_name,
+                duration=request.duration,
+                summary=request.summary,
+                objectives=request.objectives,
+                kp_list_with_description=request.kp_list
+            ):
+                parts.append(delta)
+                yield _sse_event("delta", delta)
+
+            success, content, error = JSONParser.extract_json_from_response("".join(parts))
+            if not success:
+                logger.error("Failed to parse streamed session content: %s", error)
+                yield _sse_event("error", {"error": f"JSON parsing error: {error}"})
+                return
+
+            keywords = content.get("resources", {}).get("youtubeSearchKeywords", [])
+            keyword_results, prefetched_results = await asyncio.gather(
+                youtube_service.search_videos_by_keywords_async(keywords),
+                prefetch_task
+            )
+            yield _sse_event("videos", {
+                "youtubeVideos": YouTubeHelper.merge_search_results(keyword_results, prefetched_results)
+            })
+        except Exception as e:
+            logger.error("Error streaming session content: %s", e)
+            yield _sse_event("error", {"error": str(e)})
+        finally:
+            prefetch_task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.post("/generate-detailed-content-for-sessions", response_model=APIResponse)
+async def generate_session_contents_batch(request: DetailedSessionsBatchRequest,
+                                          openai_service: OpenAIService = Depends(get_openai_service),
+                                          youtube_service: YouTubeHelper = Depends(get_youtube_helper)):
+    """
+    Generate detailed content for several sessions in a single OpenAI call
+    
+    Same content as /generate-detailed-content-for-session. Up to 4 sessions are
+    generated in one call that sends the shared output schema once; larger
+    requests (up to 20 sessions) use one call per session, run concurrently.
+    Results are returned in request order.
+    """
+    try:
+        logger.info("Generating session content for %s sessions", len(request.sessions))
+        
+        # A few sessions share one call; more are generated by concurrent per-session calls
+        if len(request.sessions) <= PromptTemplates.MAX_SESSION_CONTENT_BATCH_SIZE:
+            success, contents, error = await openai_service.generate_detailed_session_contents_batch(request.sessions)
+        else:
+            success, contents, error = await openai_service.generate_detailed_session_contents_concurrently(request.sessions)
+        
+        if not success:
+            logger.error("Failed to parse batched session content response: %s", error)
+            return APIResponse(
+                success=False,
+                message="Failed to parse AI response",
+                error=f"JSON parsing error: {error}",
+                data={"raw_response": contents}  # Include raw response for debugging
+            )
+        
+        # Search for all sessions' videos concurrently
+        youtube_results = await asyncio.gather(*(
+            youtube_service.search_videos_by_keywords_async(
+                content.get("resources", {}).get("youtubeSearchKeywords", [])
+            )
+            for content in contents
+        ))
+        
+        sessions = []
+        for session, content, videos in zip(request.sessions, contents, youtube_results):
+            content.setdefault("resources", {})["youtubeVideos"] = videos
+            sessions.append({
+                "content": content,
+                "metadata": {
+                    "session_title": session.title,
+                    "subject": session.subject_name,
+                    "class": session.class_name,
+                    "duration": session.duration,
+                    "objectives_count": len(session.objectives)
+                }
+            })
+        
+        logger.info("Generated session content for %s sessions", len(sessions))
+        return APIResponse(
+            success=True,
+            data={"sessions": sessions},
+            message="Session content generated successfully"
+        )
+        
+    except ValueError as ve:
+        logger.error("Configuration error: %s", ve)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service configuration error"
+        )
+    except Exception as e:
+        logger.error("Error generating batched session content: %s", e)
         return APIResponse(
             success=False,
             message="Failed to generate session content",
@@ -127,7 +373,8 @@ async def generate_session_content(request: DetailedSessionRequest):
 
 
 @router.post("/group-kps-into-sessions", response_model=APIResponse)
-async def group_kps_into_sessions(request: GroupKPsRequest):
+async def group_kps_into_sessions(request: GroupKPsRequest,
+                                  openai_service: OpenAIService = Depends(get_openai_service)):
     """
     Group knowledge points into teaching sessions using AI
     
@@ -138,24 +385,28 @@ async def group_kps_into_sessions(request: GroupKPsRequest):
     Returns sessions with session numbers, titles, and associated KP IDs.
     """
     try:
-        logger.info(f"Grouping KPs into {request.number_of_sessions} sessions for {request.board} {request.subject} - {request.chapter}")
+        logger.info("Grouping KPs into %s sessions for %s %s - %s", request.number_of_sessions, request.board, request.subject, request.chapter)
         
-        # Convert Pydantic models to dicts for service layer
-        kps_as_dicts = [kp.dict() for kp in request.knowledge_points]
+        # Convert Pydantic models to dicts for service layer; the same dump keys the cache
+        request_data = request.model_dump()
+        kps_as_dicts = request_data["knowledge_points"]
         
         # Call OpenAI service with board parameter
-        success, parsed_result, error = await openai_service.group_kps_into_sessions(
-            board=request.board,
-            chapter=request.chapter,
-            class_name=request.class_name,
-            subject=request.subject,
-            number_of_sessions=request.number_of_sessions,
-            session_duration=request.session_duration,
-            knowledge_points=kps_as_dicts
+        success, parsed_result, error = await get_or_compute(
+            request_cache_key("kp_grouping", request_data),
+            lambda: openai_service.group_kps_into_sessions(
+                board=request.board,
+                chapter=request.chapter,
+                class_name=request.class_name,
+                subject=request.subject,
+                number_of_sessions=request.number_of_sessions,
+                session_duration=request.session_duration,
+                knowledge_points=kps_as_dicts
+            )
         )
         
         if not success:
-            logger.error(f"Failed to group KPs: {error}")
+            logger.error("Failed to group KPs: %s", error)
             return APIResponse(
                 success=False,
                 message="Failed to parse AI response",
@@ -180,13 +431,13 @@ async def group_kps_into_sessions(request: GroupKPsRequest):
         )
         
     except ValueError as ve:
-        logger.error(f"Configuration error: {str(ve)}")
+        logger.error("Configuration error: %s", ve)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Service configuration error"
         )
     except Exception as e:
-        logger.error(f"Error grouping KPs into sessions: {str(e)}")
+        logger.error("Error grouping KPs into sessions: %s", e)
         return APIResponse(
             success=False,
             message="Failed to group knowledge points",
@@ -195,7 +446,8 @@ async def group_kps_into_sessions(request: GroupKPsRequest):
 
 
 @router.post("/generate-session-summary", response_model=APIResponse)
-async def generate_session_summary(request: SessionSummaryRequest):
+async def generate_session_summary(request: SessionSummaryRequest,
+                                   openai_service: OpenAIService = Depends(get_openai_service)):
     """
     Generate a concise instructional overview for a teaching session
     
@@ -206,23 +458,27 @@ async def generate_session_summary(request: SessionSummaryRequest):
     Returns a summary (2-4 sentences) and objectives (2-4 items).
     """
     try:
-        logger.info(f"Generating session summary for: {request.session_title} ({request.board} {request.subject})")
+        logger.info("Generating session summary for: %s (%s %s)", request.session_title, request.board, request.subject)
         
-        # Convert Pydantic models to dicts for service layer
-        kps_as_dicts = [kp.dict() for kp in request.knowledge_points]
+        # Convert Pydantic models to dicts for service layer; the same dump keys the cache
+        request_data = request.model_dump()
+        kps_as_dicts = request_data["knowledge_points"]
         
         # Call OpenAI service
-        success, parsed_result, error = await openai_service.generate_session_summary(
-            board=request.board,
-            chapter=request.chapter,
-            class_name=request.class_name,
-            subject=request.subject,
-            session_title=request.session_title,
-            knowledge_points=kps_as_dicts
+        success, parsed_result, error = await get_or_compute(
+            request_cache_key("session_summary", request_data),
+            lambda: openai_service.generate_session_summary(
+                board=request.board,
+                chapter=request.chapter,
+                class_name=request.class_name,
+                subject=request.subject,
+                session_title=request.session_title,
+                knowledge_points=kps_as_dicts
+            )
         )
         
         if not success:
-            logger.error(f"Failed to generate session summary: {error}")
+            logger.error("Failed to generate session summary: %s", error)
             return APIResponse(
                 success=False,
                 message="Failed to parse AI response",
@@ -248,15 +504,97 @@ async def generate_session_summary(request: SessionSummaryRequest):
         )
         
     except ValueError as ve:
-        logger.error(f"Configuration error: {str(ve)}")
+        logger.error("Configuration error: %s", ve)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Service configuration error"
         )
     except Exception as e:
-        logger.error(f"Error generating session summary: {str(e)}")
+        logger.error("Error generating session summary: %s", e)
         return APIResponse(
             success=False,
             message="Failed to generate session summary",
             error=str(e)
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/generate-session-summaries-batch", response_model=APIResponse)
+async def generate_session_summaries_batch(request: SessionSummariesBatchRequest,
+                                           openai_service: OpenAIService = Depends(get_openai_service)):
+    """
+    Submit session summaries for many sessions as one OpenAI Batch API job
+    
+    Batch jobs complete asynchronously (within 24 hours) at a lower cost than
+    one call per session. Poll GET /api/batch/{batch_id} for the results; each
+    result's custom_id is the session's index in the submitted list.
+    """
+    try:
+        logger.info("Submitting session summaries batch for %d sessions", len(request.sessions))
+        
+        success, result, error = await openai_service.submit_session_summaries_batch(request.sessions)
+        
+        if not success:
+            logger.error("Failed to submit session summaries batch: %s", error)
+            return APIResponse(
+                success=False,
+                message="Failed to submit session summaries batch",
+                error=error
+            )
+        
+        return APIResponse(
+            success=True,
+            data=result,
+            message="Session summaries batch submitted successfully"
+        )
+        
+    except ValueError as ve:
+        logger.error("Configuration error: %s", ve)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service configuration error"
+        )
+    except Exception as e:
+        logger.error("Error submitting session summaries batch: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to submit session summaries batch",
+            error=str(e)
+        )
+
+
+@router.get("/batch/{batch_id}", response_model=APIResponse)
+async def get_batch(batch_id: str,
+                    openai_service: OpenAIService = Depends(get_openai_service)):
+    """
+    Get the status of a Batch API job, with its parsed results once it has completed
+    """
+    try:
+        success, result, error = await openai_service.get_batch_results(batch_id)
+        
+        if not success:
+            logger.error("Failed to retrieve batch %s: %s", batch_id, error)
+            return APIResponse(
+                success=False,
+                message="Failed to retrieve batch",
+                error=error
+            )
+        
+        return APIResponse(
+            success=True,
+            data=result,
+            message=f"Batch is {result['status']}"
+        )
+        
+    except ValueError as ve:
+        logger.error("Configuration error: %s", ve)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service configuration error"
+        )
+    except Exception as e:
+        logger.error("Error retrieving batch %s: %s", batch_id, e)
+        return APIResponse(
+            success=False,
+            message="Failed to retrieve batch",
+            error=str(e)
+        )
@@ -1,19 +1,21 @@
 import logging
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 
-from models import QuestionGenerationRequest, APIResponse
+from dependencies import get_openai_service
+from models import QuestionGenerationRequest, QuestionPapersBatchRequest, APIResponse
 from services.openai_service import OpenAIService
+from utils.request_limiter import openai_request_limiter
+from utils.streaming import start_stream
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api", tags=["questions"])
-
-# Initialize OpenAI service
-openai_service = OpenAIService()
+router = APIRouter(prefix="/api", tags=["questions"], dependencies=[Depends(openai_request_limiter)])
 
 
 @router.post("/generate-questions", response_model=APIResponse)
-async def generate_questions(request: QuestionGenerationRequest):
+async def generate_questions(request: QuestionGenerationRequest,
+                             openai_service: OpenAIService = Depends(get_openai_service)):
     """
     Generate questions using OpenAI API
     
@@ -21,7 +23,7 @@ async def generate_questions(request: QuestionGenerationRequest):
     with various difficulty levels and question types suitable for the target class.
     """
     try:
-        logger.info(f"Generating questions for {request.subject_name} - Class {request.class_name}")
+        logger.info("Generating questions for %s - Class %s", request.subject_name, request.class_name)
         
         # Call OpenAI service
         success, parsed_result, error = await openai_service.generate_questions(
@@ -32,7 +34,7 @@ async def generate_questions(request: QuestionGenerationRequest):
         )
         
         if not success:
-            logger.error(f"Failed to parse questions response: {error}")
+            logger.error("Failed to parse questions response: %s", error)
             return APIResponse(
                 success=False,
                 message="Failed to parse AI response",
@@ -47,15 +49,97 @@ async def generate_questions(request: QuestionGenerationRequest):
         )
         
     except ValueError as ve:
-        logger.error(f"Configuration error: {str(ve)}")
+        logger.error("Configuration error: %s", ve)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service configuration error"
+        )
+    except Exception as e:
+        logger.error("Error generating questions: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to generate questions",
+            error=str(e)
+        )
+
+
+@router.post("/generate-question-papers", response_model=APIResponse)
+async def generate_question_papers_batch(request: QuestionPapersBatchRequest,
+                                         openai_service: OpenAIService = Depends(get_openai_service)):
+    """
+    Generate up to 8 question papers in a single OpenAI call
+    
+    Same papers as /generate-questions, but the system prompt and paper schema
+    are sent once for the whole batch. Papers are returned in request order.
+    """
+    try:
+        logger.info("Generating %s question papers", len(request.papers))
+        
+        success, papers, error = await openai_service.generate_questions_batch(
+            [paper.model_dump() for paper in request.papers]
+        )
+        
+        if not success:
+            logger.error("Failed to parse batched questions response: %s", error)
+            return APIResponse(
+                success=False,
+                message="Failed to parse AI response",
+                error=f"JSON parsing error: {error}",
+                data={"raw_response": papers}  # Include raw response for debugging
+            )
+        
+        return APIResponse(
+            success=True,
+            data={"question_papers": papers},
+            message="Question papers generated successfully"
+        )
+        
+    except ValueError as ve:
+        logger.error("Configuration error: %s", ve)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Service configuration error"
         )
     except Exception as e:
-        logger.error(f"Error generating questions: {str(e)}")
+        logger.error("Error generating question papers: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to generate question papers",
+            error=str(e)
+        )
+
+
+@router.post("/generate-questions/stream")
+async def stream_questions(request: QuestionGenerationRequest,
+                           openai_service: OpenAIService = Depends(get_openai_service)):
+    """
+    Stream a question paper as it is generated
+    
+    Returns the raw JSON text from OpenAI chunk by chunk, so the client can start
+    receiving data before generation finishes. Unlike /generate-questions, the
+    request metadata, blueprint and per-section totalMarks are not added.
+    Failures before the first chunk return the usual APIResponse error.
+    """
+    try:
+        logger.info("Streaming questions for %s - Class %s", request.subject_name, request.class_name)
+        chunks = await start_stream(openai_service.stream_questions(
+            class_name=request.class_name,
+            subject_name=request.subject_name,
+            chapters=request.chapters,
+            total_marks=request.total_marks
+        ))
+    except ValueError as ve:
+        logger.error("Configuration error: %s", ve)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service configuration error"
+        )
+    except Exception as e:
+        logger.error("Error streaming questions: %s", e)
         return APIResponse(
             success=False,
             message="Failed to generate questions",
             error=str(e)
-        )
\ No newline at end of file
+        )
+    
+    return StreamingResponse(chunks, media_type="application/json")
@@ -1,20 +1,22 @@
 import logging
-import uuid
-from fastapi import APIRouter, HTTPException, status
+import secrets
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 
+from dependencies import get_openai_service
 from models import StudentQuestionRequest, StudentAnswerResponse, ConversationMessage, APIResponse
 from services.openai_service import OpenAIService
+from utils.request_limiter import openai_request_limiter
+from utils.streaming import start_stream
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api", tags=["student"])
-
-# Initialize OpenAI service
-openai_service = OpenAIService()
+router = APIRouter(prefix="/api", tags=["student"], dependencies=[Depends(openai_request_limiter)])
 
 
 @router.post("/get-answers", response_model=APIResponse)
-async def get_student_answer(request: StudentQuestionRequest):
+async def get_student_answer(request: StudentQuestionRequest,
+                             openai_service: OpenAIService = Depends(get_openai_service)):
     """
     Get detailed answers to student questions with conversation history
     
@@ -23,7 +25,7 @@ async def get_student_answer(request: StudentQuestionRequest):
     more contextual and helpful for follow-up questions.
     """
     try:
-        logger.info(f"Processing student question: {request.question[:100]}...")
+        logger.info("Processing student question: %.100s...", request.question)
         
         # Convert conversation history to the format expected by OpenAI service
         history_dict = []
@@ -43,47 +45,80 @@ async def get_student_answer(request: StudentQuestionRequest):
         )
         
         if not success:
-            logger.error(f"Failed to get answer from OpenAI: {error}")
+            logger.error("Failed to get answer from OpenAI: %s", error)
             return APIResponse(
                 success=False,
                 message="Failed to get answer from AI service",
                 error=error
             )
         
-        # Create updated conversation history
-        updated_history = []
-        
-        # Add existing history
-        if request.conversation_history:
-            updated_history.extend(request.conversation_history)
-        
-        # Add current question and answer
-        updated_history.append(ConversationMessage(role="user", content=request.question))
-        updated_history.append(ConversationMessage(role="assistant", content=answer))
-        
-        # Create response
+        # Return only this turn's messages; the client appends them to its history
         student_response = StudentAnswerResponse(
             answer=answer,
-            conversation_id=str(uuid.uuid4()),  # Generate unique conversation ID
-            updated_history=updated_history
+            # Keep the client's conversation ID across turns; issue one on the first turn
+            conversation_id=request.conversation_id or secrets.token_hex(16),
+            new_messages=[
+                ConversationMessage(role="user", content=request.question),
+                ConversationMessage(role="assistant", content=answer)
+            ]
         )
         
         return APIResponse(
             success=True,
-            data={"response": student_response.dict()},
+            data={"response": student_response},  # Dumped together with the APIResponse
             message="Answer generated successfully"
         )
         
     except ValueError as ve:
-        logger.error(f"Configuration error: {str(ve)}")
+        logger.error("Configuration error: %s", ve)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service configuration error"
+        )
+    except Exception as e:
+        logger.error("Error getting student answer: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to get answer",
+            error=str(e)
+        )
+
+
+@router.post("/get-answers/stream")
+async def stream_student_answer(request: StudentQuestionRequest,
+                                openai_service: OpenAIService = Depends(get_openai_service)):
+    """
+    Stream the answer to a student question as plain text while it is generated
+    
+    The conversation ID is returned in the X-Conversation-Id header. The client
+    appends the question and the full streamed answer to its conversation history.
+    Failures before the first chunk return the usual APIResponse error.
+    """
+    try:
+        logger.info("Streaming answer to student question: %.100s...", request.question)
+        history_dict = [{"role": msg.role, "content": msg.content} for msg in request.conversation_history or ()]
+        chunks = await start_stream(openai_service.stream_student_answer(
+            question=request.question,
+            conversation_history=history_dict,
+            subject_name=request.subject_name,
+            class_name=request.class_name
+        ))
+    except ValueError as ve:
+        logger.error("Configuration error: %s", ve)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Service configuration error"
         )
     except Exception as e:
-        logger.error(f"Error getting student answer: {str(e)}")
+        logger.error("Error streaming student answer: %s", e)
         return APIResponse(
             success=False,
             message="Failed to get answer",
             error=str(e)
-        )
\ No newline at end of file
+        )
+    
+    return StreamingResponse(
+        chunks,
+        media_type="text/plain",
+        headers={"X-Conversation-Id": request.conversation_id or secrets.token_hex(16)}
+    )
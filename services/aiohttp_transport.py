@@ -0,0 +1,88 @@
+"""
+httpx transport that sends requests through aiohttp
+
+The OpenAI client only talks to httpx, so this lets it use aiohttp's
+connection pool, which holds up better than httpx's under many concurrent
+calls. Requires the optional aiohttp package.
+"""
+
+import asyncio
+from typing import AsyncIterator, Optional
+
+import aiohttp
+import httpx
+
+
+class _AiohttpResponseStream(httpx.AsyncByteStream):
+    """Response body read from aiohttp as it arrives"""
+
+    def __init__(self, response: aiohttp.ClientResponse):
+        self._response = response
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._response.content.iter_any():
+                yield chunk
+        except asyncio.TimeoutError as e:
+            raise httpx.ReadTimeout(str(e) or "Timed out reading the response") from e
+        except aiohttp.ClientError as e:
+            raise httpx.ReadError(str(e)) from e
+
+    async def aclose(self) -> None:
+        self._response.release()
+
+
+class AiohttpTransport(httpx.AsyncBaseTransport):
+    """httpx.AsyncBaseTransport backed by one aiohttp.ClientSession"""
+
+    def __init__(self, limit: int = 100):
+        self._limit = limit
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so the session binds to the running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._limit),
+                # httpx decodes the body itself from the Content-Encoding header
+                auto_decompress=False
+            )
+        return self._session
+
+    @staticmethod
+    def _client_timeout(request: httpx.Request) -> aiohttp.ClientTimeout:
+        timeout = request.extensions.get("timeout", {})
+        return aiohttp.ClientTimeout(
+            sock_connect=timeout.get("connect"),
+            sock_read=timeout.get("read")
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        try:
+            response = await self._get_session().request(
+                request.method,
+                str(request.url),
+                headers=request.headers.multi_items(),
+                data=body or None,
+                timeout=self._client_timeout(request),
+                allow_redirects=False
+            )
+        except asyncio.TimeoutError as e:
+            raise httpx.ConnectTimeout(str(e) or "Timed out connecting", request=request) from e
+        except aiohttp.ClientConnectionError as e:
+            raise httpx.ConnectError(str(e), request=request) from e
+        except aiohttp.ClientError as e:
+            raise httpx.NetworkError(str(e), request=request) from e
+
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.raw_headers,
+            stream=_AiohttpResponseStream(response),
+            request=request
+        )
+
+    async def aclose(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,76 @@
+"""
+Process-wide AsyncOpenAI clients
+"""
+
+import logging
+from importlib.util import find_spec
+from typing import Dict, Optional
+
+import httpx
+import orjson
+from openai import AsyncOpenAI
+
+from config import get_openai_config
+
+# httpx's default pool (100 connections, 20 keep-alive) becomes the bottleneck
+# once many generations run concurrently against the same host
+_HTTP_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=200)
+# Fail fast when no pooled connection frees up or the host is unreachable, while
+# leaving reads long enough for slow generations (each call also has its own deadline)
+_HTTP_TIMEOUT = httpx.Timeout(connect=5.0, read=120.0, write=30.0, pool=5.0)
+# HTTP/2 multiplexes concurrent calls over one connection, but needs the optional h2 package
+_HTTP2 = find_spec("h2") is not None
+# aiohttp's connection pool copes better than httpx's with many concurrent calls
+_AIOHTTP = find_spec("aiohttp") is not None
+
+logger = logging.getLogger(__name__)
+
+# One client, and so one connection pool, per API key
+_CLIENTS: Dict[str, AsyncOpenAI] = {}
+
+
+class OrjsonAsyncClient(httpx.AsyncClient):
+    """httpx.AsyncClient that serializes JSON request bodies with orjson instead of the stdlib json module"""
+
+    def build_request(self, method, url, *, content=None, data=None, files=None, json=None, headers=None, **kwargs):
+        if json is not None and content is None and data is None and not files:
+            content = orjson.dumps(json, option=orjson.OPT_NON_STR_KEYS)
+            json = None
+            headers = httpx.Headers(headers)
+            headers.setdefault("Content-Type", "application/json")
+        return super().build_request(
+            method, url, content=content, data=data, files=files, json=json, headers=headers, **kwargs
+        )
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    """HTTP client for AsyncOpenAI; sends through aiohttp when configured and installed"""
+    if get_openai_config().use_aiohttp_transport:
+        if _AIOHTTP:
+            from services.aiohttp_transport import AiohttpTransport
+            return OrjsonAsyncClient(
+                transport=AiohttpTransport(limit=_HTTP_LIMITS.max_connections),
+                timeout=_HTTP_TIMEOUT
+            )
+        logger.warning("OPENAI_USE_AIOHTTP_TRANSPORT is set but aiohttp is not installed; using httpx")
+    return OrjsonAsyncClient(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT, http2=_HTTP2)
+
+
+def get_openai_client(api_key: Optional[str] = None) -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client for an API key (the configured key by default)"""
+    api_key = api_key or get_openai_config().api_key
+    client = _CLIENTS.get(api_key)
+    if client is None:
+        client = _CLIENTS[api_key] = AsyncOpenAI(
+            api_key=api_key,
+            http_client=_create_http_client()
+        )
+    return client
+
+
+async def close_openai_client() -> None:
+    """Close every shared client's connection pool; later get_openai_client() calls create new clients"""
+    clients = list(_CLIENTS.values())
+    _CLIENTS.clear()
+    for client in clients:
+        await client.close()
@@ -1,45 +1,58 @@
+# (section, question type, marks per question, share of total marks)
+SECTIONS = (
+    ("A", "MCQ", 1, 0.15),
+    ("B", "VSA", 2, 0.15),
+    ("C", "SA", 3, 0.25),
+    ("D", "LA", 5, 0.25),
+    ("E", "CASE", 4, 0.20),
+)
+
+
 class OpenAIHelper:
     @staticmethod
     def extract_output_text(response):
-        for item in response.output:
-            if hasattr(item, "content") and item.content:
-                for c in item.content:
-                    if hasattr(c, "text") and c.text:
-                        return c.text
-        raise ValueError("No valid text content found in response")
+        """Join the text of every output_text part, in order, in a single pass"""
+        text = "".join(
+            c.text
+            for item in response.output
+            for c in getattr(item, "content", None) or ()
+            if getattr(c, "type", None) == "output_text"
+        )
+        if not text:
+            raise ValueError("No valid text content found in response")
+        return text
+    
+    @staticmethod
+    def extract_batch_output_text(body: dict):
+        """Same as extract_output_text, for a response body read from a Batch API output file"""
+        text = "".join(
+            c.get("text", "")
+            for item in body.get("output") or ()
+            for c in item.get("content") or ()
+            if c.get("type") == "output_text"
+        )
+        if not text:
+            raise ValueError("No valid text content found in response")
+        return text
     
     @staticmethod
     def allocate_marks_and_generate_blueprint(total_marks: int):
-        MARKS_PER_QUESTION = {"MCQ": 1, "VSA": 2, "SA": 3, "LA": 5, "CASE": 4}
-        SECTION_MAP = {"A": "MCQ", "B": "VSA", "C": "SA", "D": "LA", "E": "CASE"}
-
-        SECTION_DISTRIBUTION = {
-            "A": 0.15, "B": 0.15, "C": 0.25, "D": 0.25, "E": 0.20
-        }
-
-        allocated_marks = {
-            sec: round(total_marks * pct)
-            for sec, pct in SECTION_DISTRIBUTION.items()
-        }
-
-        questions_per_section = {
-            sec: max(1, allocated_marks[sec] // MARKS_PER_QUESTION[SECTION_MAP[sec]])
-            for sec in SECTION_MAP
-        }
+        questions_per_section = {}
+        actual_marks = 0
+        for sec, _, marks_per_question, share in SECTIONS:
+            count = max(1, round(total_marks * share) // marks_per_question)
+            questions_per_section[sec] = count
+            actual_marks += count * marks_per_question
 
         # Adjust marks mismatch
-        actual_marks = sum(
-            questions_per_section[sec] * MARKS_PER_QUESTION[SECTION_MAP[sec]]
-            for sec in SECTION_MAP
-        )
         diff = total_marks - actual_marks
         if diff != 0:
             questions_per_section["A"] += diff  # Adjust MCQs
 
         # --- BUILD BLUEPRINT HERE ---
         blueprint_marks = {
-            SECTION_MAP[sec]: questions_per_section[sec] * MARKS_PER_QUESTION[SECTION_MAP[sec]]
-            for sec in SECTION_MAP
+            question_type: questions_per_section[sec] * marks_per_question
+            for sec, question_type, marks_per_question, _ in SECTIONS
         }
 
         final = {
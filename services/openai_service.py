@@ -1,61 +1,181 @@
-import os
-import time
+import asyncio
+import logging
+import math
 import hashlib
-from typing import List, Dict, Any, Tuple
-from models import KPDescription
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
+import orjson
+from openai import RateLimitError
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Callable
+from models import KPDescription, LessonPlanRequest, DetailedSessionRequest, SessionSummaryRequest, KnowledgePointRequest
 from utils.json_parser import JSONParser
 from services.openai_helper import OpenAIHelper
 from utils.openai_logger import openai_timing_logger
+from utils.rate_limiter import AsyncLeakyBucket
 from config import get_openai_config
-from prompts import PromptTemplates
+from services.openai_client import get_openai_client, close_openai_client
+from services.prompt_cache import prompt_cache, request_cache_key
+from prompts import PromptTemplates, BatchReq, check_prompt_budget
+
+logger = logging.getLogger(__name__)
 
-load_dotenv()
 
 class OpenAIService:
+    # KP lists longer than this are grouped into sessions in concurrent chunks
+    KP_GROUPING_CHUNK_SIZE = 60
+    # Lesson plans with at least this many sessions are generated one session per call
+    LESSON_PLAN_SHARD_MIN_SESSIONS = 3
+
     def __init__(self):
         self.client = None
         self.config = get_openai_config()
         self._initialize_client()
+        # Bounds the per-session calls that concurrent fan-outs keep in flight at once
+        self._fan_out_semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        self._rate_limiter = AsyncLeakyBucket(
+            requests_per_minute=self.config.requests_per_minute,
+            tokens_per_minute=self.config.tokens_per_minute
+        )
 
     def _initialize_client(self):
-        self.client = AsyncOpenAI(api_key=self.config.api_key)
+        self.client = get_openai_client(self.config.api_key)
 
     def _check_client(self):
         if not self.client:
             raise RuntimeError("OpenAI client is not initialized")
 
-    @staticmethod
-    def _generate_deterministic_kp_id(board: str, grade: int, subject: str, chapter: str, kp_index: int) -> str:
-        """Generate deterministic KP ID using content hash"""
-        # Create a base prefix from board, grade, subject
-        prefix = f"{board.lower()}{grade}_{subject.lower().replace(' ', '_')}"
+    async def aclose(self):
+        """Release the OpenAI client's connections"""
+        await close_openai_client()
+        self.client = None
+
+    async def _create_response(self, model: str, input: List[Dict[str, str]],
+                               timeout: Optional[float] = None, **kwargs):
+        """Call the Responses API after checking the prompt against the configured token budget
         
-        # Generate a hash based on chapter and index for determinism
-        content = f"{chapter.lower().replace(' ', '_')}_{kp_index}"
-        hash_digest = hashlib.md5(content.encode()).hexdigest()[:6]
+        Waits for the client-side rate limiter first; the token estimate is about
+        4 characters per prompt token plus any output token cap. The call itself
+        is abandoned with a TimeoutError after `timeout` seconds
+        (config.request_timeout_seconds by default); for streams this covers the
+        request until output starts.
+        """
+        check_prompt_budget(input, model, self.config.max_prompt_tokens)
+        estimated_tokens = sum(len(message["content"]) for message in input) // 4 + kwargs.get("max_output_tokens", 0)
+        await self._rate_limiter.acquire(estimated_tokens)
+        timeout = timeout or self.config.request_timeout_seconds
+        try:
+            return await asyncio.wait_for(self.client.responses.create(model=model, input=input, **kwargs), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"OpenAI call timed out after {timeout:g}s") from None
+        except RateLimitError:
+            self._rate_limiter.penalize()
+            raise
+
+    async def _call_openai(self, function_name: str, system: str, user: str,
+                           parse: Callable[[str], Tuple[bool, Any, Optional[str]]],
+                           model: Optional[str] = None, cache: bool = False, timeout: Optional[float] = None,
+                           options: Optional[Dict[str, Any]] = None, empty: Callable[[], Any] = dict,
+                           system_len: Optional[int] = None, **log_fields) -> Tuple[bool, Any, str]:
+        """Send one system + user prompt, parse the output text and log the call under `function_name`
         
-        return f"{prefix}_{hash_digest}_kp{kp_index:02d}"
+        `parse` turns the output text into (success, data, error). `options` are
+        passed on to responses.create; with cache=True, a response that parsed
+        successfully is remembered and identical calls are answered from it
+        without calling OpenAI, logged with cache_hit=True and no token usage.
+        Any exception is returned as a failure, with empty() as the data. Fixed
+        system prompts pass their precomputed PromptTemplates.*_SYSTEM_LEN as
+        `system_len`, so only the user message is measured per request.
+        """
+        model = model or self.config.model_name
+        options = options or {}
+        messages = [
+            PromptTemplates.get_system_message(system),
+            {"role": "user", "content": user}
+        ]
+        cache_key = self._response_cache_key(model, messages, options) if cache and prompt_cache.enabled else None
+        try:
+            hit, response = prompt_cache.get(cache_key) if cache_key is not None else (False, None)
+            async with openai_timing_logger.track(
+                function_name,
+                model=model,
+                request_size=(len(system) if system_len is None else system_len) + len(user),
+                cache_hit=hit,
+                **log_fields
+            ) as call:
+                if not hit:
+                    response = await self._create_response(model=model, input=messages, timeout=timeout, **options)
+                    call.update(self._usage_fields(response.usage))
+                raw_content = OpenAIHelper.extract_output_text(response)
+                success, data, error = parse(raw_content)
+                if success and cache_key is not None and not hit:
+                    prompt_cache.set(cache_key, response)
+                call.update(
+                    success=success,
+                    error_message=error,
+                    response_length=len(raw_content) if raw_content else 0
+                )
+            return success, data, error
+        except Exception as e:
+            return False, empty(), str(e)
+
+    @staticmethod
+    def _response_cache_key(model: str, input: List[Dict[str, str]], options: Dict[str, Any]):
+        """Content-addressed key for a Responses API call"""
+        return request_cache_key("openai_response", {"model": model, "input": input, **options})
+
+    @staticmethod
+    def _usage_fields(usage) -> Dict[str, Optional[int]]:
+        """Token counts from a response's usage, as timing log fields
+        
+        The SDK always sets usage and its input_tokens_details on completed
+        responses, so their attributes are read directly; only a missing usage
+        object is allowed for.
+        """
+        if usage is None:
+            return {"tokens_used": None, "cached_tokens": None}
+        details = usage.input_tokens_details
+        return {
+            "tokens_used": usage.total_tokens,
+            "cached_tokens": details.cached_tokens if details is not None else None
+        }
+
+    def _lesson_plan_output_tokens(self, number_of_sessions: int) -> int:
+        """max_output_tokens for a lesson plan with this many sessions"""
+        return self.config.lesson_plan_tokens_per_session * number_of_sessions
+
+    def _questions_output_tokens(self, total_marks: int) -> int:
+        """max_output_tokens for one question paper, scaled by its total marks"""
+        return self.config.questions_tokens_per_5_marks * math.ceil(total_marks / 5)
+
+    @staticmethod
+    def _format_kp_descriptions(kp_list: List[KPDescription]) -> str:
+        """Format knowledge points as a numbered list for session content prompts"""
+        return "\n".join(
+            f"{i}. Title: {kp.title}, Description: {kp.description}"
+            for i, kp in enumerate(kp_list, 1)
+        )
 
     @staticmethod
     def _post_process_knowledge_points(board: str, grade: int, subject: str, chapter: str, 
                                        knowledge_points: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Post-process AI response: add kp_ids and flatten with metadata for DB storage"""
-        processed_kps = []
+        """Post-process AI response: add deterministic kp_ids and the shared chapter metadata
         
-        # Add kp_id and metadata to each KP
+        A kp_id is the board/grade/subject prefix, a short hash of the chapter and
+        KP position, and the position itself; the invariant parts are built once.
+        The board/grade/subject/chapter metadata is returned once under "meta"
+        rather than copied into every KP, so a DB import can store it as one
+        header row and bulk-insert the KPs against it.
+        """
+        prefix = f"{board.lower()}{grade}_{subject.lower().replace(' ', '_')}"
+        chapter_norm = chapter.lower().replace(' ', '_')
+        blake2b = hashlib.blake2b  # resolved once rather than per KP
+        
+        # Add kp_id to each KP
         for idx, kp in enumerate(knowledge_points, 1):
-            kp["kp_id"] = OpenAIService._generate_deterministic_kp_id(board, grade, subject, chapter, idx)
-            kp["board"] = board
-            kp["grade"] = grade
-            kp["subject"] = subject
-            kp["chapter"] = chapter
-            processed_kps.append(kp)
-        
-        # Return flattened structure (no nesting) for easier DB storage
+            hash_digest = blake2b(f"{chapter_norm}_{idx}".encode(), digest_size=3).hexdigest()
+            kp["kp_id"] = f"{prefix}_{hash_digest}_kp{idx:02d}"
+        
         return {
-            "knowledge_points": processed_kps
+            "meta": {"board": board, "grade": grade, "subject": subject, "chapter": chapter},
+            "knowledge_points": knowledge_points
         }
 
     async def generate_lesson_plan(self, subject_name: str, class_name: str, chapter_title: str,
@@ -68,58 +188,193 @@ class OpenAIService:
             number_of_sessions=number_of_sessions,
             default_session_duration=default_session_duration
         )
-        total_prompt_length = len(PromptTemplates.LESSON_PLAN_SYSTEM) + len(user_message)
-        start_time = time.time()
-        try:
-            response = await self.client.responses.create(
-                model=self.config.model_name,
-                input=[
-                    {"role": "system", "content": PromptTemplates.LESSON_PLAN_SYSTEM},
-                    {"role": "user", "content": user_message}
-                ],
-            )
-            duration = time.time() - start_time
-            raw_content = OpenAIHelper.extract_output_text(response)
-            success, data, error = JSONParser.parse_lesson_plan(raw_content)
-            openai_timing_logger.log_api_call(
-                function_name="generate_lesson_plan",
-                model=self.config.model_name,
-                duration=duration,
-                tokens_used=getattr(response.usage, 'total_tokens', None),
-                success=success,
-                error_message=error if not success else None,
-                request_size=total_prompt_length,
-                subject=subject_name,
+        return await self._call_openai(
+            "generate_lesson_plan",
+            PromptTemplates.LESSON_PLAN_SYSTEM,
+            user_message,
+            JSONParser.parse_lesson_plan,
+            system_len=PromptTemplates.LESSON_PLAN_SYSTEM_LEN,
+            cache=True,
+            timeout=self.config.lesson_plan_timeout_seconds,
+            options={
+                "text": PromptTemplates.LESSON_PLAN_OUTPUT_FORMAT,
+                "max_output_tokens": self._lesson_plan_output_tokens(number_of_sessions)
+            },
+            subject=subject_name,
+            class_name=class_name,
+            chapter_title=chapter_title,
+            num_sessions=number_of_sessions
+        )
+
+    async def generate_lesson_plan_sharded(self, subject_name: str, class_name: str, chapter_title: str,
+                                           number_of_sessions: int, default_session_duration: str) -> Tuple[bool, List[Dict[str, Any]], str]:
+        """Generate a lesson plan with one concurrent call per session
+        
+        Each call produces a single session, so wall-clock time stays close to one
+        session's latency instead of growing with number_of_sessions. Plans with
+        fewer than LESSON_PLAN_SHARD_MIN_SESSIONS sessions use the single-call
+        generate_lesson_plan. Sessions are returned in order; if any session
+        fails, its error is returned.
+        """
+        if number_of_sessions < self.LESSON_PLAN_SHARD_MIN_SESSIONS:
+            return await self.generate_lesson_plan(
+                subject_name=subject_name,
                 class_name=class_name,
                 chapter_title=chapter_title,
-                num_sessions=number_of_sessions,
-                response_length=len(raw_content) if raw_content else 0
+                number_of_sessions=number_of_sessions,
+                default_session_duration=default_session_duration
             )
-            return success, data, error
-        except Exception as e:
-            duration = time.time() - start_time
-            error_msg = str(e)
-            openai_timing_logger.log_api_call(
-                function_name="generate_lesson_plan",
+        
+        async def generate_one(session_number: int) -> Tuple[bool, Dict[str, Any], str]:
+            async with self._fan_out_semaphore:
+                return await self._generate_lesson_plan_session(
+                    subject_name, class_name, chapter_title, session_number,
+                    number_of_sessions, default_session_duration
+                )
+        
+        sessions = []
+        for success, data, error in await asyncio.gather(*(
+            generate_one(session_number) for session_number in range(1, number_of_sessions + 1)
+        )):
+            if not success:
+                return False, data, error
+            sessions.append(data)
+        return True, sessions, None
+
+    async def _generate_lesson_plan_session(self, subject_name: str, class_name: str, chapter_title: str,
+                                            session_number: int, number_of_sessions: int,
+                                            default_session_duration: str) -> Tuple[bool, Dict[str, Any], str]:
+        """Generate session `session_number` of a lesson plan"""
+        self._check_client()
+        user_message = PromptTemplates.get_lesson_plan_session_prompt(
+            subject_name=subject_name,
+            class_name=class_name,
+            chapter_title=chapter_title,
+            session_number=session_number,
+            number_of_sessions=number_of_sessions,
+            default_session_duration=default_session_duration
+        )
+        success, data, error = await self._call_openai(
+            "generate_lesson_plan_session",
+            PromptTemplates.LESSON_PLAN_SYSTEM,
+            user_message,
+            JSONParser.parse_lesson_plan_session,
+            system_len=PromptTemplates.LESSON_PLAN_SYSTEM_LEN,
+            cache=True,
+            timeout=self.config.lesson_plan_timeout_seconds,
+            options={
+                "text": PromptTemplates.LESSON_PLAN_SESSION_OUTPUT_FORMAT,
+                "max_output_tokens": self._lesson_plan_output_tokens(1)
+            },
+            subject=subject_name,
+            class_name=class_name,
+            chapter_title=chapter_title,
+            session_number=session_number,
+            num_sessions=number_of_sessions
+        )
+        if success:
+            # The position in the plan is fixed by the request, not by the model
+            data["sessionNumber"] = session_number
+        return success, data, error
+
+    async def generate_lesson_plans_batch(self, plans: List[LessonPlanRequest]) -> Tuple[bool, List[List[Dict[str, Any]]], str]:
+        """Generate several lesson plans in one call, returned in request order"""
+        self._check_client()
+        user_message = PromptTemplates.get_lesson_plans_batch_prompt([plan.model_dump() for plan in plans])
+        return await self._call_openai(
+            "generate_lesson_plans_batch",
+            PromptTemplates.LESSON_PLAN_SYSTEM,
+            user_message,
+            lambda raw_content: JSONParser.parse_lesson_plans_batch(raw_content, len(plans)),
+            system_len=PromptTemplates.LESSON_PLAN_SYSTEM_LEN,
+            timeout=self.config.lesson_plan_timeout_seconds * len(plans),
+            options={
+                "text": PromptTemplates.LESSON_PLAN_BATCH_OUTPUT_FORMAT,
+                "max_output_tokens": self._lesson_plan_output_tokens(
+                    sum(plan.number_of_sessions for plan in plans)
+                )
+            },
+            empty=list,
+            batch_size=len(plans),
+            num_sessions=sum(plan.number_of_sessions for plan in plans)
+        )
+
+    async def generate_lesson_plans_bulk(self, plans: List[LessonPlanRequest]) -> Tuple[bool, List[List[Dict[str, Any]]], str]:
+        """Generate many lesson plans, packing up to MAX_LESSON_PLAN_BATCH_SIZE plans into each call
+        
+        The calls run concurrently, at most config.max_concurrency at once. Plans
+        are returned in request order; if any call fails, its error is returned.
+        """
+        size = PromptTemplates.MAX_LESSON_PLAN_BATCH_SIZE
+        
+        async def generate_chunk(chunk: List[LessonPlanRequest]) -> Tuple[bool, List[List[Dict[str, Any]]], str]:
+            async with self._fan_out_semaphore:
+                return await self.generate_lesson_plans_batch(chunk)
+        
+        lesson_plans = []
+        for success, data, error in await asyncio.gather(*(
+            generate_chunk(plans[start:start + size]) for start in range(0, len(plans), size)
+        )):
+            if not success:
+                return False, data, error
+            lesson_plans.extend(data)
+        return True, lesson_plans, None
+
+    async def _stream_output_text(self, stream, call: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield the text deltas of a streamed response, recording its length and usage on `call`"""
+        call["response_length"] = 0
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                call["response_length"] += len(event.delta)
+                yield event.delta
+            elif event.type == "response.completed":
+                call.update(self._usage_fields(event.response.usage))
+        call["success"] = True
+
+    async def stream_lesson_plan(self, subject_name: str, class_name: str, chapter_title: str,
+                                 number_of_sessions: int, default_session_duration: str) -> AsyncIterator[str]:
+        """Yield the lesson plan JSON text as the model generates it
+        
+        The chunks are not parsed here; the client receives the raw JSON and
+        parses it once the stream ends.
+        """
+        self._check_client()
+        user_message = PromptTemplates.get_lesson_plan_prompt(
+            subject_name=subject_name,
+            class_name=class_name,
+            chapter_title=chapter_title,
+            number_of_sessions=number_of_sessions,
+            default_session_duration=default_session_duration
+        )
+        total_prompt_length = PromptTemplates.LESSON_PLAN_SYSTEM_LEN + len(user_message)
+        async with openai_timing_logger.track(
+            "stream_lesson_plan",
+            model=self.config.model_name,
+            request_size=total_prompt_length,
+            subject=subject_name,
+            class_name=class_name,
+            chapter_title=chapter_title,
+            num_sessions=number_of_sessions
+        ) as call:
+            stream = await self._create_response(
                 model=self.config.model_name,
-                duration=duration,
-                success=False,
-                error_message=error_msg,
-                request_size=total_prompt_length,
-                subject=subject_name,
-                class_name=class_name,
-                chapter_title=chapter_title
+                input=[
+                    PromptTemplates.get_system_message(PromptTemplates.LESSON_PLAN_SYSTEM),
+                    {"role": "user", "content": user_message}
+                ],
+                text=PromptTemplates.LESSON_PLAN_OUTPUT_FORMAT,
+                max_output_tokens=self._lesson_plan_output_tokens(number_of_sessions),
+                timeout=self.config.lesson_plan_timeout_seconds,
+                stream=True
             )
-            return False, {}, error_msg
+            async for delta in self._stream_output_text(stream, call):
+                yield delta
 
-    async def generate_detailed_session_content(self, title: str, subject_name: str, class_name: str, duration: str, summary: str, objectives: List[str], kp_list_with_description: List[KPDescription]) -> Any:
+    async def generate_detailed_session_content(self, title: str, subject_name: str, class_name: str, duration: str, summary: str, objectives: List[str], kp_list_with_description: List[KPDescription]) -> Tuple[bool, Dict[str, Any], str]:
         self._check_client()
         
         # Convert KP list to formatted string
-        kps_formatted = "\n".join([
-            f"{i}. Title: {kp.title}, Description: {kp.description}"
-            for i, kp in enumerate(kp_list_with_description, 1)
-        ])
+        kps_formatted = self._format_kp_descriptions(kp_list_with_description)
         
         user_message = PromptTemplates.get_session_content_prompt(
             title=title,
@@ -127,197 +382,382 @@ class OpenAIService:
             class_name=class_name,
             duration=duration,
             summary=summary,
-            objectives="\n".join([f"- {obj}" for obj in objectives]),
+            objectives="\n".join(f"- {obj}" for obj in objectives) if objectives else "",
             kp_list_with_description=kps_formatted
         )
-        total_prompt_length = len(PromptTemplates.SESSION_CONTENT_SYSTEM) + len(user_message)
-        session_title = title
-        start_time = time.time()
-        try:
-            response = await self.client.responses.create(
+        response_metadata = {
+            "sessionTitle": title,
+            "subject": subject_name,
+            "class": class_name,
+            "duration": duration,
+            "summary": summary,
+            "objectives": "\t".join(f"- {obj}" for obj in objectives) if objectives else "",
+        }
+        return await self._call_openai(
+            "generate_detailed_session_content",
+            PromptTemplates.SESSION_CONTENT_SYSTEM,
+            user_message,
+            lambda raw_content: JSONParser.extract_json_from_response(
+                raw_content, result_metadata=response_metadata, parse=True, fallback_to_raw=True
+            ),
+            system_len=PromptTemplates.SESSION_CONTENT_SYSTEM_LEN,
+            cache=True,
+            timeout=self.config.session_content_timeout_seconds,
+            options={
+                "text": PromptTemplates.JSON_OUTPUT_FORMAT,
+                "max_output_tokens": self.config.session_content_max_output_tokens
+            },
+            subject=subject_name,
+            class_name=class_name,
+            session_title=title,
+            json_format=True
+        )
+
+    async def stream_detailed_session_content(self, title: str, subject_name: str, class_name: str, duration: str, summary: str, objectives: List[str], kp_list_with_description: List[KPDescription]) -> AsyncIterator[str]:
+        """Yield the session content JSON text as the model generates it"""
+        self._check_client()
+        user_message = PromptTemplates.get_session_content_prompt(
+            title=title,
+            subject_name=subject_name,
+            class_name=class_name,
+            duration=duration,
+            summary=summary,
+            objectives="\n".join(f"- {obj}" for obj in objectives) if objectives else "",
+            kp_list_with_description=self._format_kp_descriptions(kp_list_with_description)
+        )
+        total_prompt_length = PromptTemplates.SESSION_CONTENT_SYSTEM_LEN + len(user_message)
+        async with openai_timing_logger.track(
+            "stream_detailed_session_content",
+            model=self.config.model_name,
+            request_size=total_prompt_length,
+            subject=subject_name,
+            class_name=class_name,
+            session_title=title
+        ) as call:
+            stream = await self._create_response(
                 model=self.config.model_name,
                 input=[
-                    {"role": "system", "content": PromptTemplates.SESSION_CONTENT_SYSTEM},
+                    PromptTemplates.get_system_message(PromptTemplates.SESSION_CONTENT_SYSTEM),
                     {"role": "user", "content": user_message}
                 ],
+                text=PromptTemplates.JSON_OUTPUT_FORMAT,
+                max_output_tokens=self.config.session_content_max_output_tokens,
+                timeout=self.config.session_content_timeout_seconds,
+                stream=True
             )
-            duration = time.time() - start_time
-            raw_content = OpenAIHelper.extract_output_text(response)
-            response_metadata = {
-                "sessionTitle": title,
-                "subject": subject_name,
-                "class": class_name,
-                "duration": duration,
-                "summary": summary,
-                "objectives": "\t".join([f"- {obj}" for obj in objectives]),
-            }
-            json_parse_success, result, error_message = JSONParser.extract_json_from_response(
-                raw_content, result_metadata=response_metadata, parse=True, fallback_to_raw=True
-            )
-            if not json_parse_success:
-                print(error_message)
-                print(f"Raw content: {raw_content[:200]}...")
-            openai_timing_logger.log_api_call(
-                function_name="generate_detailed_session_content",
-                model=self.config.model_name,
-                duration=duration,
-                tokens_used=getattr(response.usage, 'total_tokens', None),
-                success=json_parse_success,
-                error_message=error_message,
-                request_size=total_prompt_length,
-                subject=subject_name,
-                class_name=class_name,
-                session_title=session_title,
-                response_length=len(raw_content) if raw_content else 0,
-                json_format=True
-            )
-            return result
-        except Exception as e:
-            duration = time.time() - start_time
-            error_msg = str(e)
-            openai_timing_logger.log_api_call(
-                function_name="generate_detailed_session_content",
-                model=self.config.model_name,
-                duration=duration,
-                success=False,
-                error_message=error_msg,
-                request_size=total_prompt_length,
-                subject=subject_name,
-                class_name=class_name,
-                session_title=session_title
-            )
-            raise
+            async for delta in self._stream_output_text(stream, call):
+                yield delta
+
+    async def generate_detailed_session_contents_batch(self, sessions: List[DetailedSessionRequest]) -> Tuple[bool, List[Dict[str, Any]], str]:
+        """Generate detailed content for several sessions in one call, returned in request order"""
+        self._check_client()
+        prompt_sessions = []
+        sessions_metadata = []
+        for session in sessions:
+            prompt_sessions.append({
+                "title": session.title,
+                "subject_name": session.subject_name,
+                "class_name": session.class_name,
+                "duration": session.duration,
+                "summary": session.summary,
+                "objectives": "\n".join(f"- {obj}" for obj in session.objectives) if session.objectives else "",
+                "kp_list_with_description": self._format_kp_descriptions(session.kp_list)
+            })
+            sessions_metadata.append({
+                "sessionTitle": session.title,
+                "subject": session.subject_name,
+                "class": session.class_name,
+                "duration": session.duration,
+                "summary": session.summary,
+                "objectives": "\t".join(f"- {obj}" for obj in session.objectives) if session.objectives else "",
+            })
+
+        user_message = PromptTemplates.get_session_contents_batch_prompt(prompt_sessions)
+        return await self._call_openai(
+            "generate_detailed_session_contents_batch",
+            PromptTemplates.SESSION_CONTENT_SYSTEM,
+            user_message,
+            lambda raw_content: JSONParser.parse_session_contents_batch(raw_content, sessions_metadata),
+            system_len=PromptTemplates.SESSION_CONTENT_SYSTEM_LEN,
+            timeout=self.config.session_content_timeout_seconds * len(sessions),
+            options={
+                "text": PromptTemplates.JSON_OUTPUT_FORMAT,
+                "max_output_tokens": self.config.session_content_max_output_tokens * len(sessions)
+            },
+            empty=list,
+            batch_size=len(sessions),
+            json_format=True
+        )
+
+    async def generate_detailed_session_contents_concurrently(self, sessions: List[DetailedSessionRequest]) -> Tuple[bool, List[Dict[str, Any]], str]:
+        """Generate detailed content for each session with its own call, running the calls concurrently
+        
+        At most config.max_concurrency calls are in flight at once. Contents are
+        returned in request order; if any session fails, its error is returned.
+        """
+        async def generate_one(session: DetailedSessionRequest) -> Tuple[bool, Dict[str, Any], str]:
+            async with self._fan_out_semaphore:
+                return await self.generate_detailed_session_content(
+                    title=session.title,
+                    subject_name=session.subject_name,
+                    class_name=session.class_name,
+                    duration=session.duration,
+                    summary=session.summary,
+                    objectives=session.objectives,
+                    kp_list_with_description=session.kp_list
+                )
+        
+        contents = []
+        for success, data, error in await asyncio.gather(*(generate_one(session) for session in sessions)):
+            if not success:
+                return False, data, error
+            contents.append(data)
+        return True, contents, None
 
     async def generate_questions(self, class_name: str, subject_name: str,
                                   chapters: List[str], total_marks: int) -> Tuple[bool, Dict[str, Any], str]:
         self._check_client()
         bp = OpenAIHelper.allocate_marks_and_generate_blueprint(total_marks)
 
-        user_message = PromptTemplates.get_questions_prompt(
+        system_message, user_message = PromptTemplates.build_questions_request(
             class_name=class_name,
             subject_name=subject_name,
             chapters=chapters,
             total_marks=total_marks,
             allocation=bp["questions_per_section"]
         )
-        total_prompt_length = len(PromptTemplates.QUESTIONS_SYSTEM) + len(user_message)
-        start_time = time.time()
-        try:
-            response = await self.client.responses.create(
+        request_metadata = {
+            "class": class_name,
+            "subject": subject_name,
+            "chapters": ", ".join(chapters),
+            "totalMarks": total_marks,
+            "blueprint": bp["blueprint"]
+        }
+        return await self._call_openai(
+            "generate_questions",
+            system_message,
+            user_message,
+            lambda raw_content: JSONParser.parse_questions(raw_content, request_metadata),
+            system_len=PromptTemplates.QUESTIONS_SYSTEM_LEN,
+            cache=True,
+            timeout=self.config.questions_timeout_seconds,
+            options={
+                "text": PromptTemplates.JSON_OUTPUT_FORMAT,
+                "max_output_tokens": self._questions_output_tokens(total_marks)
+            },
+            subject=subject_name,
+            class_name=class_name,
+            chapters_count=len(chapters),
+            total_marks=total_marks,
+            json_format=True
+        )
+
+    async def stream_questions(self, class_name: str, subject_name: str,
+                               chapters: List[str], total_marks: int) -> AsyncIterator[str]:
+        """Yield the question paper JSON text as the model generates it
+        
+        This is the model's raw paper: the request metadata, blueprint and section
+        totalMarks that generate_questions adds are not included.
+        """
+        self._check_client()
+        bp = OpenAIHelper.allocate_marks_and_generate_blueprint(total_marks)
+        system_message, user_message = PromptTemplates.build_questions_request(
+            class_name=class_name,
+            subject_name=subject_name,
+            chapters=chapters,
+            total_marks=total_marks,
+            allocation=bp["questions_per_section"]
+        )
+        total_prompt_length = PromptTemplates.QUESTIONS_SYSTEM_LEN + len(user_message)
+        async with openai_timing_logger.track(
+            "stream_questions",
+            model=self.config.model_name,
+            request_size=total_prompt_length,
+            subject=subject_name,
+            class_name=class_name,
+            chapters_count=len(chapters),
+            total_marks=total_marks,
+            json_format=True
+        ) as call:
+            stream = await self._create_response(
                 model=self.config.model_name,
                 input=[
-                    {"role": "system", "content": PromptTemplates.QUESTIONS_SYSTEM},
+                    PromptTemplates.get_system_message(system_message),
                     {"role": "user", "content": user_message}
-                ]
-            )
-            duration = time.time() - start_time
-            raw_content = OpenAIHelper.extract_output_text(response)
-            request_metadata = {
-                "class": class_name,
-                "subject": subject_name,
-                "chapters": ", ".join(chapters),
-                "totalMarks": total_marks,
-                "blueprint": bp["blueprint"]
-            }
-            
-            success, data, error = JSONParser.parse_questions(raw_content, request_metadata)
-            openai_timing_logger.log_api_call(
-                function_name="generate_questions",
-                model=self.config.model_name,
-                duration=duration,
-                tokens_used=getattr(response.usage, 'total_tokens', None),
-                success=success,
-                error_message=error if not success else None,
-                request_size=total_prompt_length,
-                subject=subject_name,
-                class_name=class_name,
-                chapters_count=len(chapters),
-                total_marks=total_marks,
-                response_length=len(raw_content) if raw_content else 0,
-                json_format=True
-            )
-            return success, data, error
-        except Exception as e:
-            duration = time.time() - start_time
-            error_msg = str(e)
-            openai_timing_logger.log_api_call(
-                function_name="generate_questions",
-                model=self.config.model_name,
-                duration=duration,
-                success=False,
-                error_message=error_msg,
-                request_size=total_prompt_length,
-                subject=subject_name,
-                class_name=class_name,
-                chapters_count=len(chapters),
-                total_marks=total_marks
+                ],
+                text=PromptTemplates.JSON_OUTPUT_FORMAT,
+                max_output_tokens=self._questions_output_tokens(total_marks),
+                timeout=self.config.questions_timeout_seconds,
+                stream=True
             )
-            return False, {}, error_msg
+            async for delta in self._stream_output_text(stream, call):
+                yield delta
 
-    async def get_student_answer(self, question: str, conversation_history: List[Dict[str, str]] = None,
-                                 subject_name: str = None, class_name: str = None) -> Tuple[bool, str, str]:
+    async def generate_questions_batch(self, requests: List[Dict[str, Any]]) -> Tuple[bool, List[Dict[str, Any]], str]:
+        """Generate several question papers in a single call
+        
+        Each request needs class_name, subject_name, chapters and total_marks.
+        Papers are returned in request order.
+        """
         self._check_client()
+        prompt_requests = []
+        requests_metadata = []
+        for req in requests:
+            bp = OpenAIHelper.allocate_marks_and_generate_blueprint(req["total_marks"])
+            prompt_requests.append({**req, "allocation": bp["questions_per_section"]})
+            requests_metadata.append({
+                "class": req["class_name"],
+                "subject": req["subject_name"],
+                "chapters": ", ".join(req["chapters"]),
+                "totalMarks": req["total_marks"],
+                "blueprint": bp["blueprint"]
+            })
+
+        user_message = PromptTemplates.get_questions_batch_prompt(prompt_requests)
+        return await self._call_openai(
+            "generate_questions_batch",
+            PromptTemplates.QUESTIONS_SYSTEM,
+            user_message,
+            lambda raw_content: JSONParser.parse_questions_batch(raw_content, requests_metadata),
+            system_len=PromptTemplates.QUESTIONS_SYSTEM_LEN,
+            timeout=self.config.questions_timeout_seconds * len(requests),
+            options={
+                "text": PromptTemplates.JSON_OUTPUT_FORMAT,
+                "max_output_tokens": sum(self._questions_output_tokens(req["total_marks"]) for req in requests)
+            },
+            empty=list,
+            batch_size=len(requests),
+            json_format=True
+        )
+
+    @staticmethod
+    def _student_messages(question: str, conversation_history: List[Dict[str, str]] = None,
+                          subject_name: str = None, class_name: str = None) -> Tuple[List[Dict[str, str]], int]:
+        """Build the tutor conversation: system prompt, prior turns, then the new question
+        
+        Returns the messages and their total content length, counted as they are added.
+        The list is sized up front and filled by index in one pass over the history.
+        """
         system_prompt = PromptTemplates.get_student_tutor_system_prompt(
             subject_name=subject_name,
             class_name=class_name
         )
-        messages = [{"role": "system", "content": system_prompt}]
-        if conversation_history:
-            for msg in conversation_history:
-                messages.append({
-                    "role": msg.get("role", "user"),
-                    "content": msg.get("content", "")
-                })
-        messages.append({"role": "user", "content": question})
-        total_prompt_length = sum(len(m["content"]) for m in messages)
+        history = conversation_history or ()
+        messages = [None] * (len(history) + 2)
+        messages[0] = PromptTemplates.get_system_message(system_prompt)
+        total_length = len(system_prompt) + len(question)
+        for i, msg in enumerate(history, 1):
+            content = msg.get("content", "")
+            messages[i] = {
+                "role": msg.get("role", "user"),
+                "content": content
+            }
+            total_length += len(content)
+        messages[-1] = {"role": "user", "content": question}
+        return messages, total_length
+
+    async def _compact_history(self, conversation_history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Replace all but the most recent messages of a long conversation with a summary
+        
+        Older messages are summarized in whole blocks of
+        config.student_history_recent_messages, so the summarized prefix only
+        changes once per block and its summary is reused from the prompt cache
+        on the turns in between. Between that many and twice that many recent
+        messages stay verbatim. If summarizing fails, the full history is used.
+        """
+        block = self.config.student_history_recent_messages
+        if block <= 0 or not conversation_history or len(conversation_history) < 2 * block:
+            return conversation_history
+        
+        older = conversation_history[:(len(conversation_history) - block) // block * block]
+        key = request_cache_key("conversation_summary", {"turns": older})
+        hit, summary = prompt_cache.get(key) if prompt_cache.enabled else (False, None)
+        if not hit:
+            user_message = PromptTemplates.get_conversation_summary_prompt(older)
+            try:
+                async with openai_timing_logger.track(
+                    "summarize_conversation",
+                    model=self.config.model_name,
+                    request_size=len(PromptTemplates.CONVERSATION_SUMMARY_SYSTEM) + len(user_message),
+                    conversation_turns=len(older)
+                ) as call:
+                    response = await self._create_response(
+                        model=self.config.model_name,
+                        input=[
+                            PromptTemplates.get_system_message(PromptTemplates.CONVERSATION_SUMMARY_SYSTEM),
+                            {"role": "user", "content": user_message}
+                        ],
+                        max_output_tokens=300
+                    )
+                    summary = OpenAIHelper.extract_output_text(response)
+                    call.update(self._usage_fields(response.usage), success=True, response_length=len(summary))
+            except Exception as e:
+                logger.warning("Could not summarize conversation history, sending it in full: %s", e)
+                return conversation_history
+            if prompt_cache.enabled:
+                prompt_cache.set(key, summary)
+        
+        return [
+            {"role": "system", "content": f"Context so far: {summary}"},
+            *conversation_history[len(older):]
+        ]
+
+    async def get_student_answer(self, question: str, conversation_history: List[Dict[str, str]] = None,
+                                 subject_name: str = None, class_name: str = None) -> Tuple[bool, str, str]:
+        self._check_client()
         conversation_length = len(conversation_history) if conversation_history else 0
-        start_time = time.time()
+        conversation_history = await self._compact_history(conversation_history)
+        messages, total_prompt_length = self._student_messages(question, conversation_history, subject_name, class_name)
         try:
-            response = await self.client.responses.create(
-                model=self.config.model_name,
-                input=messages,
-                max_output_tokens=1500
-            )
-            answer = None
-            for item in response.output:
-                if getattr(item, "content", None):
-                    answer = item.content[0].text
-                    break
-            if not answer:
-                raise ValueError("No answer content found in response.")
-            duration = time.time() - start_time
-            openai_timing_logger.log_api_call(
-                function_name="get_student_answer",
+            async with openai_timing_logger.track(
+                "get_student_answer",
                 model=self.config.model_name,
-                duration=duration,
-                tokens_used=getattr(response.usage, 'total_tokens', None),
-                success=True,
                 request_size=total_prompt_length,
                 subject=subject_name or "general",
                 class_name=class_name or "general",
                 question_length=len(question),
                 conversation_turns=conversation_length,
-                response_length=len(answer),
-                max_tokens=1500,
-            )
+                max_tokens=1500
+            ) as call:
+                response = await self._create_response(
+                    model=self.config.model_name,
+                    input=messages,
+                    max_output_tokens=1500,
+                    timeout=self.config.student_answer_timeout_seconds
+                )
+                answer = OpenAIHelper.extract_output_text(response)
+                call.update(self._usage_fields(response.usage), success=True, response_length=len(answer))
             return True, answer, None
         except Exception as e:
-            duration = time.time() - start_time
-            error_msg = str(e)
-            openai_timing_logger.log_api_call(
-                function_name="get_student_answer",
+            return False, "", str(e)
+
+    async def stream_student_answer(self, question: str, conversation_history: List[Dict[str, str]] = None,
+                                    subject_name: str = None, class_name: str = None) -> AsyncIterator[str]:
+        """Yield the tutor's answer text as the model generates it"""
+        self._check_client()
+        conversation_length = len(conversation_history) if conversation_history else 0
+        conversation_history = await self._compact_history(conversation_history)
+        messages, total_prompt_length = self._student_messages(question, conversation_history, subject_name, class_name)
+        async with openai_timing_logger.track(
+            "stream_student_answer",
+            model=self.config.model_name,
+            request_size=total_prompt_length,
+            subject=subject_name or "general",
+            class_name=class_name or "general",
+            question_length=len(question),
+            conversation_turns=conversation_length,
+            max_tokens=1500
+        ) as call:
+            stream = await self._create_response(
                 model=self.config.model_name,
-                duration=duration,
-                success=False,
-                error_message=error_msg,
-                request_size=total_prompt_length,
-                subject=subject_name or "general",
-                class_name=class_name or "general",
-                question_length=len(question),
-                conversation_turns=conversation_length
+                input=messages,
+                max_output_tokens=1500,
+                timeout=self.config.student_answer_timeout_seconds,
+                stream=True
             )
-            return False, "", error_msg
-    
+            async for delta in self._stream_output_text(stream, call):
+                yield delta
+
     async def generate_knowledge_points(self, board: str, grade: int, subject: str, chapter: str,
                                        section: str = None) -> Tuple[bool, Dict[str, Any], str]:
         self._check_client()
@@ -327,74 +767,102 @@ class OpenAIService:
             chapter=chapter,
             section=section
         )
-        total_prompt_length = len(PromptTemplates.KNOWLEDGE_POINTS_SYSTEM) + len(user_message)
-        start_time = time.time()
-        try:
-            response = await self.client.responses.create(
-                model=self.config.model_name_5,
-                input=[
-                    {"role": "system", "content": PromptTemplates.KNOWLEDGE_POINTS_SYSTEM},
-                    {"role": "user", "content": user_message}
-                ],
-            )
-            duration = time.time() - start_time
-            raw_content = OpenAIHelper.extract_output_text(response)
-            success, data, error = JSONParser.extract_json_from_response(
-                raw_content, parse=True, fallback_to_raw=True
+        success, data, error = await self._call_openai(
+            "generate_knowledge_points",
+            PromptTemplates.KNOWLEDGE_POINTS_SYSTEM,
+            user_message,
+            JSONParser.extract_json_from_response,
+            system_len=PromptTemplates.KNOWLEDGE_POINTS_SYSTEM_LEN,
+            model=self.config.model_name_5,
+            options={"text": PromptTemplates.JSON_OUTPUT_FORMAT},
+            board=board,
+            subject=subject,
+            grade=grade,
+            chapter=chapter,
+            section=section or "all"
+        )
+        
+        # Post-process: add kp_ids and wrap in syllabus structure
+        if success and isinstance(data, dict) and "knowledge_points" in data:
+            data = self._post_process_knowledge_points(
+                board=board,
+                grade=grade,
+                subject=subject,
+                chapter=chapter,
+                knowledge_points=data["knowledge_points"]
             )
-            
-            # Post-process: add kp_ids and wrap in syllabus structure
-            if success and isinstance(data, dict) and "knowledge_points" in data:
-                knowledge_points = data.get("knowledge_points", [])
-                processed_data = self._post_process_knowledge_points(
+        return success, data, error
+
+    async def generate_knowledge_points_bulk(self, board: str, grade: int, subject: str, chapter: str,
+                                            sections: List[str]) -> Tuple[bool, Dict[str, Any], str]:
+        """Generate knowledge points for several sections of a chapter, one concurrent call per section
+        
+        At most config.max_concurrency calls are in flight at once. The KPs are
+        merged in section order and given kp_ids numbered continuously across
+        the chapter; if any section fails, its error is returned.
+        """
+        async def generate_one(section: str) -> Tuple[bool, Dict[str, Any], str]:
+            async with self._fan_out_semaphore:
+                return await self.generate_knowledge_points(
                     board=board,
                     grade=grade,
                     subject=subject,
                     chapter=chapter,
-                    knowledge_points=knowledge_points
+                    section=section
                 )
-                data = processed_data
-            
-            openai_timing_logger.log_api_call(
-                function_name="generate_knowledge_points",
-                model=self.config.model_name_5,
-                duration=duration,
-                tokens_used=getattr(response.usage, 'total_tokens', None),
-                success=success,
-                error_message=error if not success else None,
-                request_size=total_prompt_length,
-                board=board,
-                subject=subject,
-                grade=grade,
-                chapter=chapter,
-                section=section or "all",
-                response_length=len(raw_content) if raw_content else 0
-            )
-            return success, data, error
-        except Exception as e:
-            duration = time.time() - start_time
-            error_msg = str(e)
-            openai_timing_logger.log_api_call(
-                function_name="generate_knowledge_points",
-                model=self.config.model_name_5,
-                duration=duration,
-                success=False,
-                error_message=error_msg,
-                request_size=total_prompt_length,
-                board=board,
-                subject=subject,
-                grade=grade,
-                chapter=chapter,
-                section=section or "all"
-            )
-            return False, {}, error_msg
+        
+        knowledge_points = []
+        results = await asyncio.gather(*(generate_one(section) for section in sections))
+        for section, (success, data, error) in zip(sections, results):
+            if not success:
+                return False, data, f"Section '{section}': {error}"
+            if isinstance(data, dict):
+                knowledge_points.extend(data.get("knowledge_points", []))
+        return True, self._post_process_knowledge_points(board, grade, subject, chapter, knowledge_points), None
 
     async def group_kps_into_sessions(self, board: str, chapter: str, class_name: str, subject: str,
                                      number_of_sessions: int, session_duration: str,
                                      knowledge_points: List[Dict[str, Any]]) -> Tuple[bool, Dict[str, Any], str]:
-        """Group knowledge points into teaching sessions"""
+        """Group knowledge points into teaching sessions
+        
+        Lists longer than KP_GROUPING_CHUNK_SIZE are split, in request order, into
+        consecutive chunks that are grouped concurrently, each into its share of
+        the sessions; the sessions are then renumbered in chunk order.
+        """
         self._check_client()
         
+        num_chunks = min(-(-len(knowledge_points) // self.KP_GROUPING_CHUNK_SIZE), number_of_sessions)
+        if num_chunks <= 1:
+            return await self._group_kp_chunk(board, chapter, class_name, subject, number_of_sessions,
+                                              session_duration, knowledge_points)
+        
+        kps_per_chunk, extra_kps = divmod(len(knowledge_points), num_chunks)
+        sessions_per_chunk, extra_sessions = divmod(number_of_sessions, num_chunks)
+        calls = []
+        start = 0
+        for index in range(num_chunks):
+            end = start + kps_per_chunk + (index < extra_kps)
+            calls.append(self._group_kp_chunk(
+                board, chapter, class_name, subject,
+                sessions_per_chunk + (index < extra_sessions),
+                session_duration, knowledge_points[start:end]
+            ))
+            start = end
+        
+        sessions = []
+        for success, data, error in await asyncio.gather(*calls):
+            if not success:
+                return success, data, error
+            sessions.extend(data.get("sessions", []))
+        for session_number, session in enumerate(sessions, start=1):
+            session["session_number"] = session_number
+        return True, {"sessions": sessions}, None
+
+    async def _group_kp_chunk(self, board: str, chapter: str, class_name: str, subject: str,
+                              number_of_sessions: int, session_duration: str,
+                              knowledge_points: List[Dict[str, Any]]) -> Tuple[bool, Dict[str, Any], str]:
+        """Group one list of knowledge points into sessions with a single OpenAI call"""
+        
         # Generate dynamic system prompt with board context
         system_prompt = PromptTemplates.get_kp_grouping_system_prompt(board=board)
         
@@ -407,57 +875,19 @@ class OpenAIService:
             session_duration=session_duration,
             knowledge_points=knowledge_points
         )
-        total_prompt_length = len(system_prompt) + len(user_message)
-        start_time = time.time()
-        try:
-            response = await self.client.responses.create(
-                model=self.config.model_name,
-                input=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-            )
-            duration = time.time() - start_time
-            raw_content = OpenAIHelper.extract_output_text(response)
-            success, data, error = JSONParser.extract_json_from_response(
-                raw_content, parse=True, fallback_to_raw=True
-            )
-            
-            openai_timing_logger.log_api_call(
-                function_name="group_kps_into_sessions",
-                model=self.config.model_name,
-                duration=duration,
-                tokens_used=getattr(response.usage, 'total_tokens', None),
-                success=success,
-                error_message=error if not success else None,
-                request_size=total_prompt_length,
-                board=board,
-                subject=subject,
-                class_name=class_name,
-                chapter=chapter,
-                num_sessions=number_of_sessions,
-                num_kps=len(knowledge_points),
-                response_length=len(raw_content) if raw_content else 0
-            )
-            return success, data, error
-        except Exception as e:
-            duration = time.time() - start_time
-            error_msg = str(e)
-            openai_timing_logger.log_api_call(
-                function_name="group_kps_into_sessions",
-                model=self.config.model_name,
-                duration=duration,
-                success=False,
-                error_message=error_msg,
-                request_size=total_prompt_length,
-                board=board,
-                subject=subject,
-                class_name=class_name,
-                chapter=chapter,
-                num_sessions=number_of_sessions,
-                num_kps=len(knowledge_points)
-            )
-            return False, {}, error_msg
+        return await self._call_openai(
+            "group_kps_into_sessions",
+            system_prompt,
+            user_message,
+            JSONParser.extract_json_from_response,
+            options={"text": PromptTemplates.JSON_OUTPUT_FORMAT},
+            board=board,
+            subject=subject,
+            class_name=class_name,
+            chapter=chapter,
+            num_sessions=number_of_sessions,
+            num_kps=len(knowledge_points)
+        )
 
     async def generate_session_summary(self, board: str, chapter: str, class_name: str, subject: str,
                                       session_title: str, knowledge_points: List[Dict[str, Any]]) -> Tuple[bool, Dict[str, Any], str]:
@@ -472,54 +902,161 @@ class OpenAIService:
             session_title=session_title,
             knowledge_points=knowledge_points
         )
-        total_prompt_length = len(PromptTemplates.SESSION_SUMMARY_SYSTEM) + len(user_message)
-        start_time = time.time()
-        try:
-            response = await self.client.responses.create(
-                model=self.config.model_name,
-                input=[
-                    {"role": "system", "content": PromptTemplates.SESSION_SUMMARY_SYSTEM},
-                    {"role": "user", "content": user_message}
-                ],
-            )
-            duration = time.time() - start_time
-            raw_content = OpenAIHelper.extract_output_text(response)
-            success, data, error = JSONParser.extract_json_from_response(
-                raw_content, parse=True, fallback_to_raw=True
+        return await self._call_openai(
+            "generate_session_summary",
+            PromptTemplates.SESSION_SUMMARY_SYSTEM,
+            user_message,
+            JSONParser.extract_json_from_response,
+            system_len=PromptTemplates.SESSION_SUMMARY_SYSTEM_LEN,
+            options={"text": PromptTemplates.JSON_OUTPUT_FORMAT},
+            board=board,
+            chapter=chapter,
+            subject=subject,
+            class_name=class_name,
+            session_title=session_title,
+            num_kps=len(knowledge_points)
+        )
+
+    async def submit_session_summaries_batch(self, sessions: List[SessionSummaryRequest]) -> Tuple[bool, Dict[str, Any], str]:
+        """Submit one session summary request per session as a single OpenAI Batch API job
+        
+        Each request line's custom_id is the session's index in the submitted list.
+        """
+        self._check_client()
+        return await self._submit_batch("session_summaries", [
+            BatchReq(
+                custom_id=str(index),
+                system=PromptTemplates.SESSION_SUMMARY_SYSTEM,
+                user=PromptTemplates.get_session_summary_prompt(
+                    board=session.board,
+                    chapter=session.chapter,
+                    class_name=session.class_name,
+                    subject=session.subject,
+                    session_title=session.session_title,
+                    knowledge_points=[kp.model_dump() for kp in session.knowledge_points]
+                ),
+                model=self.config.model_name
             )
-            
-            openai_timing_logger.log_api_call(
-                function_name="generate_session_summary",
-                model=self.config.model_name,
-                duration=duration,
-                tokens_used=getattr(response.usage, 'total_tokens', None),
-                success=success,
-                error_message=error if not success else None,
-                request_size=total_prompt_length,
-                board=board,
-                chapter=chapter,
-                subject=subject,
-                class_name=class_name,
-                session_title=session_title,
-                num_kps=len(knowledge_points),
-                response_length=len(raw_content) if raw_content else 0
+            for index, session in enumerate(sessions)
+        ])
+
+    async def submit_knowledge_points_batch(self, jobs: List[KnowledgePointRequest]) -> Tuple[bool, Dict[str, Any], str]:
+        """Submit one knowledge point request per chapter/section as a single OpenAI Batch API job
+        
+        For bulk syllabus ingestion, where the Batch API's lower price matters more
+        than latency. Each custom_id is the job's index in the submitted list; the
+        board, grade, subject and chapter travel as the request's metadata, which
+        its response echoes back, so get_batch_results can add kp_ids and meta to
+        each result.
+        """
+        self._check_client()
+        return await self._submit_batch("knowledge_points", [
+            BatchReq(
+                custom_id=str(index),
+                system=PromptTemplates.KNOWLEDGE_POINTS_SYSTEM,
+                user=PromptTemplates.get_knowledge_points_prompt(
+                    grade=job.grade,
+                    subject=job.subject,
+                    chapter=job.chapter,
+                    section=job.section
+                ),
+                model=self.config.model_name_5,
+                metadata={"board": job.board, "grade": str(job.grade), "subject": job.subject, "chapter": job.chapter}
             )
-            return success, data, error
+            for index, job in enumerate(jobs)
+        ])
+
+    async def _submit_batch(self, job: str, requests: List[BatchReq]) -> Tuple[bool, Dict[str, Any], str]:
+        """Upload requests as a Batch API input file and start the job, tagged with `job` in its metadata"""
+        batch_input = PromptTemplates.to_batch_jsonl(requests)
+        try:
+            async with openai_timing_logger.track(
+                f"submit_{job}_batch",
+                model=requests[0]["model"],
+                request_size=len(batch_input),
+                num_requests=len(requests)
+            ) as call:
+                input_file = await self.client.files.create(
+                    file=(f"{job}.jsonl", batch_input),
+                    purpose="batch"
+                )
+                batch = await self.client.batches.create(
+                    input_file_id=input_file.id,
+                    endpoint="/v1/responses",
+                    completion_window="24h",
+                    metadata={"job": job}
+                )
+                call.update(success=True, batch_id=batch.id)
+            return True, {"batch_id": batch.id, "status": batch.status, "total_requests": len(requests)}, None
         except Exception as e:
-            duration = time.time() - start_time
-            error_msg = str(e)
-            openai_timing_logger.log_api_call(
-                function_name="generate_session_summary",
-                model=self.config.model_name,
-                duration=duration,
-                success=False,
-                error_message=error_msg,
-                request_size=total_prompt_length,
-                board=board,
-                chapter=chapter,
-                subject=subject,
-                class_name=class_name,
-                session_title=session_title,
-                num_kps=len(knowledge_points)
-            )
-            return False, {}, error_msg
\ No newline at end of file
+            return False, {}, str(e)
+
+    async def get_batch_results(self, batch_id: str) -> Tuple[bool, Dict[str, Any], str]:
+        """Report a Batch API job's status, with the parsed JSON result of every request once it has finished"""
+        self._check_client()
+        try:
+            batch = await self.client.batches.retrieve(batch_id)
+        except Exception as e:
+            return False, {}, str(e)
+        
+        data = {
+            "batch_id": batch.id,
+            "status": batch.status,
+            "request_counts": batch.request_counts.model_dump() if batch.request_counts else None
+        }
+        if batch.status != "completed":
+            return True, data, None
+        
+        knowledge_points_job = (batch.metadata or {}).get("job") == "knowledge_points"
+        results = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await self.client.files.content(file_id)
+            for line in content.content.splitlines():
+                if not line:
+                    continue
+                record = orjson.loads(line)
+                result = self._parse_batch_result_line(record)
+                if knowledge_points_job and result["success"]:
+                    result["data"] = self._post_process_batch_knowledge_points(
+                        (record["response"]["body"] or {}).get("metadata") or {}, result["data"]
+                    )
+                results.append(result)
+        # Output order is not guaranteed; custom_ids are the submission index
+        results.sort(key=lambda result: self._batch_index(result["custom_id"]))
+        data["results"] = results
+        return True, data, None
+
+    @staticmethod
+    def _batch_index(custom_id: str) -> int:
+        """Submission index held in a custom_id, or -1 if it is not one"""
+        return int(custom_id) if custom_id.isdigit() else -1
+
+    @staticmethod
+    def _post_process_batch_knowledge_points(metadata: Dict[str, str], data: Any) -> Any:
+        """Add kp_ids and meta to one knowledge points batch result, using the job fields echoed in its metadata"""
+        if not isinstance(data, dict) or "knowledge_points" not in data or not metadata:
+            return data
+        return OpenAIService._post_process_knowledge_points(
+            board=metadata["board"],
+            grade=int(metadata["grade"]),
+            subject=metadata["subject"],
+            chapter=metadata["chapter"],
+            knowledge_points=data["knowledge_points"]
+        )
+
+    @staticmethod
+    def _parse_batch_result_line(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn one Batch API output line into a {custom_id, success, data, error} result"""
+        custom_id = record.get("custom_id", "")
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            error = (record.get("error") or (response.get("body") or {}).get("error") or {}).get("message", "Request failed")
+            return {"custom_id": custom_id, "success": False, "data": None, "error": error}
+        try:
+            raw_content = OpenAIHelper.extract_batch_output_text(response["body"])
+        except ValueError as e:
+            return {"custom_id": custom_id, "success": False, "data": None, "error": str(e)}
+        success, parsed, error = JSONParser.extract_json_from_response(raw_content, parse=True, fallback_to_raw=True)
+        return {"custom_id": custom_id, "success": success, "data": parsed, "error": error}
@@ -0,0 +1,103 @@
+"""
+In-process cache for generated OpenAI results
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+import orjson
+
+from config import get_openai_config
+
+logger = logging.getLogger(__name__)
+
+ServiceResult = Tuple[bool, Any, str]
+
+
+class PromptCache:
+    """LRU cache with a per-entry time-to-live, keyed by canonical request fields
+    
+    get_or_compute also coalesces concurrent misses for the same key onto a
+    single in-flight call, so a burst of identical requests reaches OpenAI once.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, "asyncio.Task[ServiceResult]"] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (hit, value) for a key, dropping it if it has expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: Hashable,
+                             coro_factory: Callable[[], Awaitable[ServiceResult]]) -> ServiceResult:
+        """Return a cached service result, or call the service and cache it if it succeeded"""
+        if not self.enabled:
+            return await coro_factory()
+
+        hit, value = self.get(key)
+        if hit:
+            logger.info("Prompt cache hit for %s", key[0])
+            return True, value, None
+
+        task = self._in_flight.get(key)
+        if task is None:
+            logger.info("Prompt cache miss for %s", key[0])
+            task = asyncio.ensure_future(self._compute(key, coro_factory))
+            self._in_flight[key] = task
+        else:
+            logger.info("Prompt cache joined in-flight call for %s", key[0])
+        # Shielded so a caller that goes away does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: Hashable,
+                       coro_factory: Callable[[], Awaitable[ServiceResult]]) -> ServiceResult:
+        try:
+            success, data, error = await coro_factory()
+            if success:
+                self.set(key, data)
+            return success, data, error
+        finally:
+            del self._in_flight[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def request_cache_key(namespace: str, payload: Dict[str, Any]) -> Tuple[str, bytes]:
+    """Build a compact cache key from a request body, independent of field order"""
+    digest = hashlib.blake2b(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS), digest_size=16).digest()
+    return namespace, digest
+
+
+_config = get_openai_config()
+prompt_cache = PromptCache(maxsize=_config.cache_max_entries, ttl=_config.cache_ttl_seconds)
+
+
+async def get_or_compute(key: Hashable, coro_factory: Callable[[], Awaitable[ServiceResult]]) -> ServiceResult:
+    """Look up or compute a result in the shared prompt cache"""
+    return await prompt_cache.get_or_compute(key, coro_factory)
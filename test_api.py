@@ -4,19 +4,25 @@ Test script to verify the School AI API functionality
 """
 
 import requests
-import json
-import time
+from requests.adapters import HTTPAdapter
+import orjson
 
 # API base URL
 BASE_URL = "http://localhost:8000"
+# Request bodies are serialized with orjson, so the content type is set explicitly
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# One session for every call, so the connection to the API server is reused
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=20, pool_maxsize=50))
 
 def test_health_check():
     """Test the health check endpoint"""
     print("🔍 Testing health check...")
     try:
-        response = requests.get(f"{BASE_URL}/health")
+        response = session.get(f"{BASE_URL}/health")
         print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.json()}")
+        print(f"Response: {orjson.loads(response.content)}")
         return response.status_code == 200
     except requests.exceptions.ConnectionError:
         print("❌ Connection failed. Make sure the API server is running.")
@@ -38,11 +44,11 @@ def test_lesson_plan_generation():
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/api/generate-lesson-plan", json=payload)
+        response = session.post(f"{BASE_URL}/api/generate-lesson-plan", data=orjson.dumps(payload), headers=JSON_HEADERS)
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             print(f"Success: {result['success']}")
             print(f"Message: {result['message']}")
             if result.get('success') and result.get('data'):
@@ -85,11 +91,11 @@ def test_session_content_generation():
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/api/session-content", json=payload)
+        response = session.post(f"{BASE_URL}/api/session-content", data=orjson.dumps(payload), headers=JSON_HEADERS)
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             print(f"Success: {result['success']}")
             print(f"Message: {result['message']}")
             if result.get('success') and result.get('data'):
@@ -119,11 +125,11 @@ def test_question_generation():
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/api/questions", json=payload)
+        response = session.post(f"{BASE_URL}/api/questions", data=orjson.dumps(payload), headers=JSON_HEADERS)
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             print(f"Success: {result['success']}")
             print(f"Message: {result['message']}")
             if result.get('success') and result.get('data'):
@@ -147,6 +153,50 @@ def test_question_generation():
         print(f"❌ Error: {e}")
         return False
 
+def test_question_papers_batch_generation():
+    """Test batched question paper generation"""
+    print("\n🗂️ Testing batched question paper generation...")
+    
+    payload = {
+        "papers": [
+            {
+                "class_name": "8th",
+                "subject_name": "Mathematics",
+                "chapters": ["Linear Equations in One Variable"],
+                "total_marks": 20
+            },
+            {
+                "class_name": "8th",
+                "subject_name": "Science",
+                "chapters": ["Force and Pressure"],
+                "total_marks": 20
+            }
+        ]
+    }
+    
+    try:
+        response = session.post(f"{BASE_URL}/api/generate-question-papers", data=orjson.dumps(payload), headers=JSON_HEADERS)
+        print(f"Status Code: {response.status_code}")
+        
+        if response.status_code == 200:
+            result = orjson.loads(response.content)
+            print(f"Success: {result['success']}")
+            print(f"Message: {result['message']}")
+            if result.get('success') and result.get('data'):
+                papers = result['data']['question_papers']
+                print(f"Generated {len(papers)} question papers")
+                return len(papers) == len(payload["papers"])
+            else:
+                print(f"Error: {result.get('error', 'Unknown error')}")
+                return False
+        else:
+            print(f"Error: {response.text}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("🚀 Starting School AI API Tests")
@@ -176,6 +226,10 @@ def main():
     question_result = test_question_generation()
     test_results.append(("Question Generation", question_result))
     
+    # Test batched question paper generation
+    papers_result = test_question_papers_batch_generation()
+    test_results.append(("Question Papers Batch", papers_result))
+    
     # Print summary
     print("\n" + "=" * 50)
     print("📊 TEST SUMMARY")
@@ -4,10 +4,17 @@ Test script to verify the JSON parser integration
 """
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import orjson
 
 # API base URL
 BASE_URL = "http://localhost:8000"
+# Request bodies are serialized with orjson, so the content type is set explicitly
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# One session for every call, so the connection to the API server is reused
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=20, pool_maxsize=50))
 
 def test_json_parsing():
     """Test that JSON parsing works correctly for all endpoints"""
@@ -25,8 +32,8 @@ def test_json_parsing():
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/api/generate-lesson-plan", json=lesson_plan_payload)
-        result = response.json()
+        response = session.post(f"{BASE_URL}/api/generate-lesson-plan", data=orjson.dumps(lesson_plan_payload), headers=JSON_HEADERS)
+        result = orjson.loads(response.content)
         
         print(f"Status Code: {response.status_code}")
         print(f"Success: {result['success']}")
@@ -71,8 +78,8 @@ def test_json_parsing():
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/api/session-content", json=session_content_payload)
-        result = response.json()
+        response = session.post(f"{BASE_URL}/api/session-content", data=orjson.dumps(session_content_payload), headers=JSON_HEADERS)
+        result = orjson.loads(response.content)
         
         print(f"Status Code: {response.status_code}")
         print(f"Success: {result['success']}")
@@ -103,8 +110,8 @@ def test_json_parsing():
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/api/questions", json=questions_payload)
-        result = response.json()
+        response = session.post(f"{BASE_URL}/api/questions", data=orjson.dumps(questions_payload), headers=JSON_HEADERS)
+        result = orjson.loads(response.content)
         
         print(f"Status Code: {response.status_code}")
         print(f"Success: {result['success']}")
@@ -1,6 +1,12 @@
-import json
+import orjson
 import re
-from typing import Tuple, Any, Optional
+from typing import Tuple, Any, Optional, List
+from pydantic import ValidationError
+from models import LessonPlanBatchOutput, LessonPlanOutput, LessonPlanSession
+
+# Everything _clean_json_content removes, in one pattern compiled at import:
+# // line comments, /* block comments */ and commas before a closing } or ]
+_CLEANUP_RE = re.compile(r'//[^\n]*|/\*.*?\*/|,\s*(?=[}\]])', re.DOTALL)
 
 class JSONParser:
     @staticmethod
@@ -17,16 +23,23 @@ class JSONParser:
             If parse=True: Tuple of (success: bool, parsed_data: Any, error_message: Optional[str])
             If parse=False: Extracted JSON string
         """
-        if not raw_content or not isinstance(raw_content, str):
+        # Remove markdown code blocks if present
+        # Look for ```json ... ``` or ``` ... ``` patterns: the text between the
+        # first fence and the next one, without a leading "json" tag
+        try:
+            fence_start = raw_content.find('```')
+        except (AttributeError, TypeError):
+            # None or anything else that is not a string
             if not parse:
                 return ""
             return False, None, "Empty or invalid content provided"
-        
-        # Remove markdown code blocks if present
-        # Look for ```json ... ``` or ``` ... ``` patterns
-        json_match = re.search(r'```(?:json)?\s*(.*?)\s*```', raw_content, re.DOTALL)
-        if json_match:
-            json_content = json_match.group(1).strip()
+        fence_end = raw_content.find('```', fence_start + 3) if fence_start >= 0 else -1
+        if fence_end >= 0:
+            # Slice once, after the tag, rather than copying the block twice
+            content_start = fence_start + 3
+            if raw_content.startswith('json', content_start, fence_end):
+                content_start += 4
+            json_content = raw_content[content_start:fence_end].strip()
         else:
             # If no code blocks found, use the raw content
             json_content = raw_content.strip()
@@ -34,21 +47,32 @@ class JSONParser:
         # If not parsing, just return the extracted string
         if not parse:
             return json_content
+
+        if not json_content:
+            return False, None, "Empty or invalid content provided"
         
+        # A response cut off by a timeout or the output token cap cannot parse;
+        # fail cheaply instead of attempting a parse and a cleanup pass
+        if json_content[-1:] not in ('}', ']'):
+            return False, raw_content if fallback_to_raw else None, "Incomplete JSON response (possibly truncated): it does not end with '}' or ']'"
+
         # Parse the JSON with error handling and cleanup
         try:
             # Try to parse as-is first (for pure JSON responses)
             try:
-                parsed_data = json.loads(json_content)
-                return True, parsed_data if result_metadata is None else JSONParser.merge_dicts(result_metadata, parsed_data), None
+                parsed_data = orjson.loads(json_content)
+                return True, JSONParser.merge_dicts(result_metadata, parsed_data) if result_metadata else parsed_data, None
                 
-            except json.JSONDecodeError:
-                # Try cleaning up common JSON issues
+            except orjson.JSONDecodeError:
+                # Try cleaning up common JSON issues; if there was nothing to
+                # clean, report the original error without parsing again
                 cleaned_json = JSONParser._clean_json_content(json_content)
-                parsed_data = json.loads(cleaned_json)
-                return True, parsed_data if result_metadata is None else JSONParser.merge_dicts(result_metadata, parsed_data), None
+                if cleaned_json == json_content:
+                    raise
+                parsed_data = orjson.loads(cleaned_json)
+                return True, JSONParser.merge_dicts(result_metadata, parsed_data) if result_metadata else parsed_data, None
                 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             error_msg = f"JSON parsing failed: {str(e)}"
             return False, raw_content if fallback_to_raw else None, error_msg
             
@@ -67,26 +91,71 @@ class JSONParser:
         Returns:
             Cleaned JSON string
         """
-        # Remove trailing commas before closing brackets/braces
-        cleaned = re.sub(r',\s*}', '}', json_content)
-        cleaned = re.sub(r',\s*]', ']', cleaned)
+        # Remove comments (// or /* */) and trailing commas before closing
+        # brackets/braces in a single pass
+        return _CLEANUP_RE.sub('', json_content)
+    
+    @staticmethod
+    def parse_lesson_plan(raw_content):
+        """
+        Parse lesson plan from OpenAI response into its list of sessions
         
-        # Remove comments (// or /* */)
-        cleaned = re.sub(r'//.*?$', '', cleaned, flags=re.MULTILINE)
-        cleaned = re.sub(r'/\*.*?\*/', '', cleaned, flags=re.DOTALL)
+        The response is requested in strict JSON schema mode, so it is validated
+        directly against LessonPlanOutput without markdown stripping or cleanup.
+        Returns: (success: bool, data: list/str, error: str/None)
+        """
+        if not raw_content or not isinstance(raw_content, str):
+            return False, None, "Empty or invalid content provided"
+        try:
+            lesson_plan = LessonPlanOutput.model_validate_json(raw_content)
+        except ValidationError as e:
+            return False, raw_content, f"JSON parsing failed: {e}"
+        return True, lesson_plan.model_dump()["sessions"], None
+    
+    @staticmethod
+    def parse_lesson_plans_batch(raw_content, num_plans: int):
+        """
+        Parse a batched lesson plan response into one list of sessions per request, in request order
+        Returns: (success: bool, data: list/str, error: str/None)
+        """
+        if not raw_content or not isinstance(raw_content, str):
+            return False, None, "Empty or invalid content provided"
+        try:
+            batch = LessonPlanBatchOutput.model_validate_json(raw_content)
+        except ValidationError as e:
+            return False, raw_content, f"JSON parsing failed: {e}"
+        
+        sessions_by_id = {result.requestId: result.sessions for result in batch.results}
+        plans = []
+        missing = []
+        for request_id in range(1, num_plans + 1):
+            sessions = sessions_by_id.get(request_id)
+            if sessions is None:
+                missing.append(request_id)
+                plans.append(None)
+                continue
+            plans.append([session.model_dump() for session in sessions])
         
-        return cleaned
+        if missing:
+            return False, plans, f"No lesson plan returned for requests: {missing}"
+        return True, plans, None
     
     @staticmethod
-    def parse_lesson_plan(raw_content):
+    def parse_lesson_plan_session(raw_content):
         """
-        Parse lesson plan from OpenAI response
+        Parse one lesson plan session, requested in strict JSON schema mode
         Returns: (success: bool, data: dict/str, error: str/None)
         """
-        return JSONParser.extract_json_from_response(raw_content, parse=True)
+        if not raw_content or not isinstance(raw_content, str):
+            return False, None, "Empty or invalid content provided"
+        try:
+            session = LessonPlanSession.model_validate_json(raw_content)
+        except ValidationError as e:
+            return False, raw_content, f"JSON parsing failed: {e}"
+        return True, session.model_dump(), None
     
     @staticmethod
-    def parse_questions(raw_content, request_metadata: dict = {}):
+    def parse_questions(raw_content, request_metadata: dict = None):
         """
         Parse questions from OpenAI response and calculate totalMarks for each section
         Returns: (success: bool, data: dict/str, error: str/None)
@@ -95,14 +164,76 @@ class JSONParser:
             raw_content, result_metadata=request_metadata, parse=True
         )
         
-        if success and isinstance(parsed_data, dict) and 'sections' in parsed_data:
-            # Add totalMarks to each section
-            for section in parsed_data['sections']:
-                total_marks = JSONParser._calculate_section_marks(section)
-                section['totalMarks'] = total_marks
+        if success:
+            JSONParser._add_section_totals(parsed_data)
         
         return success, parsed_data, error
     
+    @staticmethod
+    def parse_questions_batch(raw_content, requests_metadata: List[dict]):
+        """
+        Parse a batched questions response into one paper per request, in request order
+        Returns: (success: bool, data: list/str, error: str/None)
+        """
+        success, parsed_data, error = JSONParser.extract_json_from_response(raw_content, parse=True)
+        if not success:
+            return success, parsed_data, error
+        
+        results = parsed_data.get('results') if isinstance(parsed_data, dict) else None
+        if not isinstance(results, list):
+            return False, raw_content, "Batched response is missing the 'results' list"
+        
+        papers_by_id = {
+            item.get('requestId'): item.get('paper')
+            for item in results
+            if isinstance(item, dict)
+        }
+        
+        papers = []
+        missing = []
+        for request_id, metadata in enumerate(requests_metadata, 1):
+            paper = papers_by_id.get(request_id)
+            if not isinstance(paper, dict):
+                missing.append(request_id)
+                papers.append(None)
+                continue
+            paper = JSONParser.merge_dicts(metadata, paper)
+            JSONParser._add_section_totals(paper)
+            papers.append(paper)
+        
+        if missing:
+            return False, papers, f"No question paper returned for requests: {missing}"
+        return True, papers, None
+    
+    @staticmethod
+    def parse_session_contents_batch(raw_content, sessions_metadata: List[dict]):
+        """
+        Parse a fused session content response into one content object per session, in order
+        Returns: (success: bool, data: list/str, error: str/None)
+        """
+        success, parsed_data, error = JSONParser.extract_json_from_response(raw_content, parse=True)
+        if not success:
+            return success, parsed_data, error
+        
+        sessions = parsed_data.get('sessions') if isinstance(parsed_data, dict) else None
+        if not isinstance(sessions, list) or not all(isinstance(session, dict) for session in sessions):
+            return False, raw_content, "Batched response is missing the 'sessions' list"
+        if len(sessions) != len(sessions_metadata):
+            return False, raw_content, f"Expected {len(sessions_metadata)} sessions, got {len(sessions)}"
+        
+        return True, [
+            JSONParser.merge_dicts(metadata, session)
+            for metadata, session in zip(sessions_metadata, sessions)
+        ], None
+    
+    @staticmethod
+    def _add_section_totals(paper: Any) -> None:
+        """Add totalMarks to each section of a parsed question paper"""
+        if isinstance(paper, dict) and 'sections' in paper:
+            for section in paper['sections']:
+                total_marks = JSONParser._calculate_section_marks(section)
+                section['totalMarks'] = total_marks
+    
     @staticmethod
     def _calculate_section_marks(section: dict) -> int:
         """
@@ -114,25 +245,23 @@ class JSONParser:
         Returns:
             Total marks for the section
         """
-        total = 0
+        questions = section.get('questions')
+        if not isinstance(questions, list):
+            return 0
         
-        if 'questions' in section and isinstance(section['questions'], list):
-            for question in section['questions']:
-                # Handle regular questions with marks field
-                if 'marks' in question:
-                    total += question['marks']
-                
-                # Handle case-based questions with subQuestions
-                if 'subQuestions' in question and isinstance(question['subQuestions'], list):
-                    for sub_q in question['subQuestions']:
-                        if 'marks' in sub_q:
-                            total += sub_q['marks']
-        
-        return total
+        # Regular questions carry marks directly; case-based questions add
+        # the marks of their subQuestions
+        return sum(
+            question.get('marks', 0)
+            + sum(sub_q.get('marks', 0) for sub_q in question.get('subQuestions') or ())
+            for question in questions
+        )
     
     @staticmethod
     def merge_dicts(dict1: dict, dict2: dict) -> dict:
         """
         Merge two dictionaries, with values from dict2 overwriting those in dict1
         """
-        return {**dict1, **dict2}
\ No newline at end of file
+        merged = dict1.copy()
+        merged.update(dict2)
+        return merged
\ No newline at end of file
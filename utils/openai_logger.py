@@ -1,12 +1,49 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+import threading
 import time
-import json
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+import orjson
+from typing import Dict, Any, Optional, List, AsyncIterator
+from contextlib import asynccontextmanager
 from functools import wraps
+from importlib.util import find_spec
 import asyncio
 import os
 
+# Monotonic integer nanoseconds; durations only become floats when logged
+_perf_counter_ns = time.perf_counter_ns
+
+# With several worker processes writing the same timing log, this optional
+# package locks and rotates the file safely across them
+_CONCURRENT_LOG_HANDLER = find_spec("concurrent_log_handler") is not None
+_LOG_MAX_BYTES = 10_000_000
+_LOG_BACKUP_COUNT = 5
+
+# Timing records are written to the file in batches of up to this many...
+_LOG_BUFFER_CAPACITY = 128
+# ...and at least this often, so records never wait longer than this on an idle server
+_LOG_FLUSH_INTERVAL = 5.0
+
+
+class _BufferedHandler(logging.handlers.MemoryHandler):
+    """MemoryHandler that a background thread also flushes every flush_interval seconds"""
+    
+    def __init__(self, capacity: int, flush_interval: float, **kwargs):
+        super().__init__(capacity, **kwargs)
+        self.flush_interval = flush_interval
+        self._stop_flushing = threading.Event()
+        threading.Thread(target=self._flush_periodically, name="openai-timing-log-flush", daemon=True).start()
+    
+    def _flush_periodically(self) -> None:
+        while not self._stop_flushing.wait(self.flush_interval):
+            self.flush()
+    
+    def close(self) -> None:
+        self._stop_flushing.set()
+        super().close()
+
 
 class OpenAITimingLogger:
     """Logger specifically for tracking OpenAI API call timings and metrics"""
@@ -26,7 +63,16 @@ class OpenAITimingLogger:
         # Prevent duplicate handlers
         if not logger.handlers:
             # Create file handler
-            handler = logging.FileHandler(self.log_file, encoding='utf-8')
+            if _CONCURRENT_LOG_HANDLER:
+                from concurrent_log_handler import ConcurrentRotatingFileHandler
+                handler = ConcurrentRotatingFileHandler(
+                    self.log_file,
+                    maxBytes=_LOG_MAX_BYTES,
+                    backupCount=_LOG_BACKUP_COUNT,
+                    encoding='utf-8'
+                )
+            else:
+                handler = logging.FileHandler(self.log_file, encoding='utf-8')
             handler.setLevel(logging.INFO)
             
             # Create detailed formatter
@@ -36,7 +82,28 @@ class OpenAITimingLogger:
             )
             handler.setFormatter(formatter)
             
-            logger.addHandler(handler)
+            # Batch records into fewer, larger writes; errors are written
+            # straight away, together with anything buffered before them
+            buffered_handler = _BufferedHandler(
+                _LOG_BUFFER_CAPACITY,
+                _LOG_FLUSH_INTERVAL,
+                flushLevel=logging.ERROR,
+                target=handler
+            )
+            buffered_handler.setLevel(logging.INFO)
+            
+            # Records are only queued on the calling (event loop) thread; a
+            # listener thread writes them to the file, keeping disk I/O off
+            # the request path
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(log_queue, buffered_handler, respect_handler_level=True)
+            listener.start()
+            # Flush whatever is still queued or buffered when the process
+            # exits (atexit runs these in reverse, so the queue drains first)
+            atexit.register(buffered_handler.close)
+            atexit.register(listener.stop)
+            
+            logger.addHandler(logging.handlers.QueueHandler(log_queue))
             logger.propagate = False
         
         return logger
@@ -49,6 +116,8 @@ class OpenAITimingLogger:
                     success: bool = True,
                     error_message: Optional[str] = None,
                     request_size: Optional[int] = None,
+                    cached_tokens: Optional[int] = None,
+                    cache_hit: bool = False,
                     **extra_data) -> None:
         """
         Log OpenAI API call with timing and metrics
@@ -61,6 +130,9 @@ class OpenAITimingLogger:
             success: Whether the call was successful
             error_message: Error message if call failed
             request_size: Size of the request payload
+            cached_tokens: Prompt tokens served from OpenAI's prompt cache
+            cache_hit: Whether the response came from the local response cache
+                instead of an OpenAI call
             extra_data: Additional data to log
         """
         
@@ -69,8 +141,7 @@ class OpenAITimingLogger:
             'model': model,
             'duration_seconds': round(duration, 3),
             'duration_ms': round(duration * 1000, 1),
-            'success': success,
-            'timestamp': datetime.now().isoformat()
+            'success': success
         }
         
         if tokens_used is not None:
@@ -80,6 +151,12 @@ class OpenAITimingLogger:
         if request_size is not None:
             log_data['request_size_chars'] = request_size
         
+        if cached_tokens is not None:
+            log_data['cached_tokens'] = cached_tokens
+        
+        if cache_hit:
+            log_data['cache_hit'] = True
+        
         if error_message:
             log_data['error'] = error_message
         
@@ -88,27 +165,59 @@ class OpenAITimingLogger:
         
         # Create readable log message
         status = "SUCCESS" if success else "FAILED"
-        message_parts = [
-            f"OpenAI API Call [{status}]",
-            f"Function: {function_name}",
-            f"Model: {model}",
-            f"Duration: {log_data['duration_seconds']}s"
-        ]
+        log_message = (
+            f"OpenAI API Call [{status}] | Function: {function_name} | Model: {model}"
+            f" | Duration: {log_data['duration_seconds']}s"
+        )
         
         if tokens_used is not None:
-            message_parts.append(f"Tokens: {tokens_used}")
-            message_parts.append(f"Rate: {log_data['tokens_per_second']}/s")
+            log_message += f" | Tokens: {tokens_used} | Rate: {log_data['tokens_per_second']}/s"
         
-        if error_message:
-            message_parts.append(f"Error: {error_message}")
+        if cached_tokens is not None:
+            log_message += f" | Cached: {cached_tokens}"
+        
+        if cache_hit:
+            log_message += " | Cache: HIT"
         
-        log_message = " | ".join(message_parts)
+        if error_message:
+            log_message += f" | Error: {error_message}"
         
         # Log with structured data
-        if success:
-            self.logger.info(f"{log_message} | Data: {json.dumps(log_data, separators=(',', ':'))}")
-        else:
-            self.logger.error(f"{log_message} | Data: {json.dumps(log_data, separators=(',', ':'))}")
+        log = self.logger.info if success else self.logger.error
+        log(f"{log_message} | Data: {orjson.dumps(log_data).decode()}")
+    
+    @asynccontextmanager
+    async def track(self, function_name: str, model: str, **fields) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Time the enclosed block and log it once as an OpenAI API call
+        
+        The block records its outcome (success, tokens_used, error_message and any
+        extra fields) in the yielded dict, on top of the fields given here, such as
+        cache_hit=True for a response served from the local cache. The
+        call is logged as failed unless the block sets success; if the block
+        raises, the exception message is logged and the exception propagates.
+        
+        Usage:
+            async with openai_timing_logger.track("generate_lesson_plan", model=model) as call:
+                response = await client.responses.create(...)
+                call.update(success=True, tokens_used=response.usage.total_tokens)
+        """
+        record = {'success': False}
+        start_ns = _perf_counter_ns()
+        try:
+            yield record
+        except Exception as e:
+            record['success'] = False
+            record['error_message'] = str(e)
+            raise
+        finally:
+            fields.update(record)
+            self.log_api_call(
+                function_name=function_name,
+                model=model,
+                duration=(_perf_counter_ns() - start_ns) / 1e9,
+                **fields
+            )
     
     def log_batch_summary(self, batch_data: List[Dict[str, Any]]) -> None:
         """Log summary of multiple API calls"""
@@ -128,17 +237,15 @@ class OpenAITimingLogger:
             'total_duration_seconds': round(total_duration, 3),
             'average_duration_seconds': round(total_duration / total_calls, 3) if total_calls > 0 else 0,
             'total_tokens': total_tokens,
-            'average_tokens_per_call': round(total_tokens / total_calls, 1) if total_calls > 0 else 0,
-            'timestamp': datetime.now().isoformat()
+            'average_tokens_per_call': round(total_tokens / total_calls, 1) if total_calls > 0 else 0
         }
         
-        self.logger.info(f"Batch Summary | {json.dumps(summary, separators=(',', ':'))}")
+        self.logger.info(f"Batch Summary | {orjson.dumps(summary).decode()}")
 
 
 # Global logger instance
 openai_timing_logger = OpenAITimingLogger()
 
-
 def log_openai_timing(function_name: Optional[str] = None):
     """
     Decorator to automatically log OpenAI API call timings
@@ -153,15 +260,15 @@ def log_openai_timing(function_name: Optional[str] = None):
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
             func_name = function_name or func.__name__
-            start_time = time.time()
+            start_time = time.perf_counter()
             
             try:
                 result = await func(*args, **kwargs)
-                duration = time.time() - start_time
+                duration = time.perf_counter() - start_time
                 
                 # Try to extract model info from args/kwargs if available
                 model = "unknown"
-                if hasattr(args[0], 'config') and hasattr(args[0].config, 'model_name'):
+                if args and hasattr(args[0], 'config') and hasattr(args[0].config, 'model_name'):
                     model = args[0].config.model_name
                 
                 # Extract additional info from result if it's a tuple with success status
@@ -183,7 +290,7 @@ def log_openai_timing(function_name: Optional[str] = None):
                 return result
                 
             except Exception as e:
-                duration = time.time() - start_time
+                duration = time.perf_counter() - start_time
                 
                 # Try to get model info
                 model = "unknown"
@@ -203,15 +310,15 @@ def log_openai_timing(function_name: Optional[str] = None):
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
             func_name = function_name or func.__name__
-            start_time = time.time()
+            start_time = time.perf_counter()
             
             try:
                 result = func(*args, **kwargs)
-                duration = time.time() - start_time
+                duration = time.perf_counter() - start_time
                 
                 # Try to extract model info
                 model = "unknown"
-                if hasattr(args[0], 'config') and hasattr(args[0].config, 'model_name'):
+                if args and hasattr(args[0], 'config') and hasattr(args[0].config, 'model_name'):
                     model = args[0].config.model_name
                 
                 openai_timing_logger.log_api_call(
@@ -224,7 +331,7 @@ def log_openai_timing(function_name: Optional[str] = None):
                 return result
                 
             except Exception as e:
-                duration = time.time() - start_time
+                duration = time.perf_counter() - start_time
                 
                 # Try to get model info
                 model = "unknown"
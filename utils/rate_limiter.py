@@ -0,0 +1,72 @@
+"""
+Client-side OpenAI rate limiting
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncLeakyBucket:
+    """Requests-per-minute and tokens-per-minute limiter for outgoing OpenAI calls
+
+    Both budgets refill continuously over a one-minute window. acquire() waits
+    until a call fits in both, so bursts are spread out before they reach
+    OpenAI instead of coming back as 429s. A limit of 0 disables that budget.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated_at = time.monotonic()
+        # Waiters are served in arrival order
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests_per_minute > 0 or self.tokens_per_minute > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed_minutes = (now - self._updated_at) / 60
+        self._updated_at = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed_minutes * self.requests_per_minute)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed_minutes * self.tokens_per_minute)
+
+    def _wait_seconds(self, tokens: int) -> float:
+        """Seconds until one request of `tokens` fits in both budgets"""
+        wait = 0.0
+        if self.requests_per_minute > 0 and self._requests < 1:
+            wait = (1 - self._requests) * 60 / self.requests_per_minute
+        if self.tokens_per_minute > 0 and self._tokens < tokens:
+            wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+        return wait
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait until a call using about `estimated_tokens` tokens is within the limits, then reserve it"""
+        if not self.enabled:
+            return
+        # A single call larger than the whole budget is let through once the bucket is full
+        tokens = min(estimated_tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                self._refill()
+                wait = self._wait_seconds(tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self._requests -= 1
+            self._tokens -= tokens
+
+    def penalize(self) -> None:
+        """Empty both budgets after OpenAI reports a rate limit, so later calls back off"""
+        if not self.enabled:
+            return
+        logger.warning("OpenAI rate limit hit; draining the client-side budget")
+        self._refill()
+        self._requests = min(self._requests, 0.0)
+        self._tokens = min(self._tokens, 0.0)
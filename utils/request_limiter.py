@@ -0,0 +1,42 @@
+"""
+Per-worker limit on concurrent OpenAI-backed requests
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator
+
+from fastapi import HTTPException, status
+
+from config import get_openai_config
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLimiter:
+    """FastAPI dependency that rejects requests with 503 once `limit` are already in flight
+    
+    Requests over the limit are turned away immediately rather than queued, so a
+    burst cannot slow down the requests that are already running. The slot is
+    held until the response, including a streamed one, has been sent.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+
+    async def __call__(self) -> AsyncIterator[None]:
+        if self._semaphore is None:
+            yield
+            return
+        if self._semaphore.locked():
+            logger.warning("Rejecting request: %d requests already in flight", self.limit)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly"
+            )
+        async with self._semaphore:
+            yield
+
+
+openai_request_limiter = RequestLimiter(get_openai_config().concurrent_requests_per_worker)
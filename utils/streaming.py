@@ -0,0 +1,35 @@
+"""
+Helpers for endpoints that stream OpenAI output
+"""
+
+import logging
+from typing import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+
+async def start_stream(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Wait for the first chunk of a stream, then return an iterator over all of it
+
+    Anything that fails before output starts (configuration, prompt budget,
+    rate limit, timeout or OpenAI errors) is raised here, while the endpoint
+    can still return an error response instead of a 200. A failure after
+    output has started can only end the body early; it is logged and the
+    stream closed, so the client sees a truncated body.
+    """
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = None
+
+    async def all_chunks() -> AsyncIterator[str]:
+        if first_chunk is None:
+            return
+        yield first_chunk
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            logger.error("Stream failed after output started: %s", e)
+
+    return all_chunks()